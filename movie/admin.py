@@ -1,5 +1,19 @@
 from django.contrib import admin
-from .models import Movie
+from .models import Cluster, Movie, Genre, Job
 
 # Register your models here.
-admin.site.register(Movie)
\ No newline at end of file
+admin.site.register(Movie)
+admin.site.register(Genre)
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'movie', 'status', 'priority', 'attempts', 'run_after', 'updated_at')
+    list_filter = ('kind', 'status')
+    raw_id_fields = ('movie',)
+
+
+@admin.register(Cluster)
+class ClusterAdmin(admin.ModelAdmin):
+    list_display = ('id', 'label', 'size', 'generation')
+    exclude = ('centroid',)
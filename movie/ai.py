@@ -0,0 +1,107 @@
+"""
+Acceso compartido a la API de OpenAI.
+
+El SDK de OpenAI y numpy se importan la primera vez que se usan, no al
+cargar la app: así `manage.py check`, las migraciones y las vistas que no
+llaman a la API no pagan su costo de importación. La API key se lee de
+``openai_apikey`` (settings.py carga el .env una sola vez al arrancar).
+"""
+import os
+import threading
+
+from . import instrumentation
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_DIM = 1536  # longitud de los vectores de EMBEDDING_MODEL
+COMPLETION_MODEL = "gpt-3.5-turbo"
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Cliente de OpenAI reutilizado por todo el proceso."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from openai import OpenAI
+                _client = OpenAI(api_key=os.environ.get('openai_apikey'))
+    return _client
+
+
+def get_embeddings(texts):
+    """Embeddings (float32) de varios textos en una sola llamada a la API."""
+    import numpy as np
+
+    response = get_client().embeddings.create(input=list(texts), model=EMBEDDING_MODEL)
+    return [np.array(item.embedding, dtype=np.float32) for item in response.data]
+
+
+def get_embedding(text):
+    """Genera un embedding para el texto dado usando la API de OpenAI."""
+    return get_embeddings([text])[0]
+
+
+def get_completion(prompt, model=COMPLETION_MODEL):
+    messages = [{"role": "user", "content": prompt}]
+    response = get_client().chat.completions.create(
+        model=model,
+        messages=messages,
+        temperature=0,  # For deterministic, consistent responses
+    )
+    return response.choices[0].message.content.strip()
+
+
+# ✅ Instruction to guide the AI response
+DESCRIPTION_INSTRUCTION = (
+    "Vas a actuar como un aficionado del cine que sabe describir de forma clara, "
+    "concisa y precisa cualquier película en menos de 200 palabras. La descripción "
+    "debe incluir el género de la película y cualquier información adicional que sirva "
+    "para crear un sistema de recomendación."
+)
+
+
+def describe_movie(title, description):
+    """Descripción nueva para la película, generada a partir de la actual."""
+    prompt = (
+        f"{DESCRIPTION_INSTRUCTION} "
+        f"Vas a actualizar la descripción '{description}' de la película '{title}'."
+    )
+    return get_completion(prompt)
+
+
+def generate_poster(movie_title, save_folder):
+    """
+    Generates an image using OpenAI's DALL·E model and downloads it.
+    Returns the relative image path or raises an exception.
+    """
+    import requests
+
+    prompt = f"Movie poster of {movie_title}"
+
+    # ✅ Generate image with OpenAI (DALL-E 3)
+    with instrumentation.span('image.generate'):
+        response = get_client().images.generate(
+            model="dall-e-3",
+            prompt=prompt,
+            size="1024x1024",     # DALL-E 3 requiere tamaños de 1024x1024, 1792x1024, o 1024x1792
+            quality="standard",
+            n=1,
+        )
+    image_url = response.data[0].url
+
+    # ✅ Prepare the filename and full save path
+    image_filename = f"m_{movie_title}.png"
+    image_path_full = os.path.join(save_folder, image_filename)
+
+    # ✅ Download the image
+    with instrumentation.span('image.download'):
+        image_response = requests.get(image_url)
+    image_response.raise_for_status()
+    os.makedirs(save_folder, exist_ok=True)
+    with open(image_path_full, 'wb') as f:
+        f.write(image_response.content)
+
+    # ✅ Return relative path to be saved in the DB
+    return os.path.join('movie/images', image_filename)
@@ -0,0 +1,250 @@
+"""
+API JSON de solo lectura (películas, noticias y recomendaciones).
+
+Los listados se envían con ``StreamingHttpResponse`` recorriendo el queryset
+con ``.values().iterator()``: no se crean instancias del modelo y la memoria
+no crece con el tamaño del catálogo. Parámetros comunes:
+
+- ``fields=id,title``: columnas a devolver (por defecto, todas menos emb).
+- ``limit``: filas por página (``0`` = todas, para exportar el catálogo).
+- ``cursor``: el valor ``next`` de la página anterior (paginación por clave,
+  sin OFFSET: cada página cuesta lo mismo).
+- ``embeddings=float16`` (solo películas): añade ``emb`` en base64 float16.
+"""
+import base64
+import functools
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+
+from . import ai, result_cache
+from .models import Movie
+from .views import get_recommendations
+
+MOVIE_FIELDS = ('id', 'title', 'description', 'image', 'url', 'genre', 'year')
+
+_encoder = DjangoJSONEncoder(ensure_ascii=False)
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def api_view(view):
+    """GET solamente; los ApiError se responden como {"detail": ...}."""
+    @require_GET
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except ApiError as e:
+            return JsonResponse({'detail': str(e)}, status=e.status)
+    return wrapper
+
+
+def parse_fields(request, allowed, default=None):
+    raw = request.GET.get('fields')
+    if not raw:
+        return list(default or allowed)
+    fields = [field.strip() for field in raw.split(',') if field.strip()]
+    unknown = sorted(set(fields) - set(allowed))
+    if unknown:
+        raise ApiError(f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(allowed)}")
+    return fields
+
+
+def parse_limit(request):
+    try:
+        limit = int(request.GET.get('limit', settings.API_PAGE_SIZE))
+    except ValueError:
+        raise ApiError("limit must be an integer")
+    if limit < 0:
+        raise ApiError("limit must be >= 0")
+    return limit
+
+
+def encode_cursor(values):
+    payload = _encoder.encode(values).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except ValueError:
+        raise ApiError("Invalid cursor")
+    if not isinstance(values, list):
+        raise ApiError("Invalid cursor")
+    return values
+
+
+def keyset_filter(ordering, values, model=None):
+    """
+    Filas estrictamente después de ``values`` en el orden ``ordering``;
+    p. ej. ('-date', '-id') -> date < d OR (date = d AND id < i).
+
+    Con ``model`` cada valor se valida con su campo (un cursor manipulado
+    da 400, no un error de la BD).
+    """
+    if len(values) != len(ordering):
+        raise ApiError("Invalid cursor")
+    if model is not None:
+        values = [_cursor_value(model, field.lstrip('-'), value) for field, value in zip(ordering, values)]
+    condition = Q()
+    equal = {}
+    for field, value in zip(ordering, values):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        condition |= Q(**equal, **{f'{name}__{lookup}': value})
+        equal[name] = value
+    return condition
+
+
+def _cursor_value(model, name, value):
+    if value is None or isinstance(value, (bool, list, dict)):
+        raise ApiError("Invalid cursor")
+    try:
+        return model._meta.get_field(name).to_python(value)
+    except (ValidationError, TypeError, ValueError):
+        raise ApiError("Invalid cursor")
+
+
+def parse_int(request, name):
+    """?name= como entero (None si no viene)."""
+    value = request.GET.get(name)
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ApiError(f"{name} must be an integer")
+
+
+def stream_page(request, queryset, fields, ordering=('id',), transform=None):
+    """
+    Respuesta ``{"results": [...], "next": cursor|null}`` generada fila a fila.
+
+    ``ordering`` debe ser único (terminar en la PK) para que el cursor no
+    salte ni repita filas.
+    """
+    limit = parse_limit(request)
+    cursor = request.GET.get('cursor')
+    if cursor:
+        queryset = queryset.filter(keyset_filter(ordering, decode_cursor(cursor), queryset.model))
+    keys = [field.lstrip('-') for field in ordering]
+    columns = list(dict.fromkeys(fields + keys))
+    queryset = queryset.order_by(*ordering).values(*columns)
+    if limit:
+        # Una fila de más para saber si hay página siguiente
+        queryset = queryset[:limit + 1]
+    chunk_size = settings.API_CHUNK_SIZE
+
+    def generate():
+        yield '{"results": ['
+        count = 0
+        last = next_cursor = None
+        buffer = []
+        for row in queryset.iterator(chunk_size=chunk_size):
+            if limit and count == limit:
+                # Sobró la fila extra: hay otra página a partir de la última enviada
+                next_cursor = encode_cursor([last[key] for key in keys])
+                break
+            if transform is not None:
+                transform(row)
+            buffer.append((',' if count else '') + _encoder.encode({field: row[field] for field in fields}))
+            count += 1
+            last = row
+            if len(buffer) >= chunk_size:
+                yield ''.join(buffer)
+                buffer = []
+        yield ''.join(buffer) + '], "next": ' + _encoder.encode(next_cursor) + '}'
+
+    return StreamingHttpResponse(generate(), content_type='application/json')
+
+
+# --- Películas ---
+
+def embedding_float16(row):
+    """
+    Sustituye emb (bytes float32) por su versión float16 en base64: la mitad de tamaño.
+
+    Las filas sin un embedding real (p. ej. el valor por defecto, float64 de
+    otra longitud) devuelven null en vez de bytes reinterpretados.
+    """
+    import numpy as np
+
+    if row['emb'] is None or len(row['emb']) != ai.EMBEDDING_DIM * 4:
+        row['emb'] = None
+        return
+    emb = np.frombuffer(row['emb'], dtype=np.float32).astype(np.float16)
+    row['emb'] = base64.b64encode(emb.tobytes()).decode('ascii')
+
+
+def movie_fields(request):
+    fields = parse_fields(request, MOVIE_FIELDS)
+    embeddings = request.GET.get('embeddings', '')
+    if embeddings not in ('', 'float16'):
+        raise ApiError("embeddings must be 'float16'")
+    if embeddings:
+        fields.append('emb')
+    return fields
+
+
+@api_view
+def movie_list(request):
+    """Catálogo filtrable por ?genre=<slug>, ?search=<título> y ?year=."""
+    fields = movie_fields(request)
+    movies = Movie.objects.all()
+    if request.GET.get('genre'):
+        movies = movies.filter(genres__slug=request.GET['genre'])
+    if request.GET.get('search'):
+        movies = movies.filter(title__icontains=request.GET['search'])
+    year = parse_int(request, 'year')
+    if year is not None:
+        movies = movies.filter(year=year)
+    transform = embedding_float16 if 'emb' in fields else None
+    return stream_page(request, movies, fields, transform=transform)
+
+
+@api_view
+def movie_detail(request, pk):
+    fields = movie_fields(request)
+    row = Movie.objects.filter(pk=pk).values(*fields).first()
+    if row is None:
+        raise ApiError("Movie not found", status=404)
+    if 'emb' in fields:
+        embedding_float16(row)
+    return JsonResponse(row, json_dumps_params={'ensure_ascii': False})
+
+
+@api_view
+def recommend(request):
+    """Las ?k= películas más parecidas a ?prompt= (opcionalmente de ?genre=), con su similitud."""
+    prompt = request.GET.get('prompt', '').strip()
+    if not prompt:
+        raise ApiError("prompt is required")
+    genre = request.GET.get('genre', '')
+    try:
+        k = int(request.GET.get('k', 1))
+    except ValueError:
+        raise ApiError("k must be an integer")
+    if not 1 <= k <= settings.RECOMMENDATION_CACHE_K:
+        raise ApiError(f"k must be between 1 and {settings.RECOMMENDATION_CACHE_K}")
+    fields = parse_fields(request, MOVIE_FIELDS, default=('id', 'title', 'year', 'genre', 'image'))
+
+    result_cache.log_prompt(prompt, genre)
+    results = get_recommendations(prompt, genre)[:k]
+    rows = Movie.objects.filter(pk__in=[movie_id for movie_id, _ in results]).values('id', *fields)
+    rows = {row['id']: row for row in rows}
+    movies = [
+        {**{field: rows[movie_id][field] for field in fields}, 'score': score}
+        for movie_id, score in results if movie_id in rows
+    ]
+    return JsonResponse({'prompt': prompt, 'genre': genre, 'results': movies}, json_dumps_params={'ensure_ascii': False})
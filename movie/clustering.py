@@ -0,0 +1,284 @@
+"""
+Agrupación temática del catálogo con k-means por mini-lotes (esférico).
+
+Los embeddings se leen del índice del motor de recomendación (normalizado
+y mapeado desde disco), así que la memoria no depende del tamaño del
+catálogo: cada iteración toma un mini-lote aleatorio, y la asignación final
+recorre la matriz por bloques. El estado (centroides, contadores, iteración
+y generador aleatorio) se guarda cada cierto número de iteraciones para
+poder continuar un entrenamiento interrumpido con ``--resume``.
+
+Los centroides sirven también como primer filtro barato de
+``recommend_movie``: con RECOMMEND_CLUSTER_PROBES > 0 solo se puntúan las
+películas de los grupos más cercanos al prompt (más las que aún no tienen
+grupo).
+"""
+import json
+import math
+import os
+import threading
+from collections import Counter, defaultdict
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Count
+
+from . import instrumentation
+from .models import Cluster, IndexGeneration, Movie, MovieGenre
+
+REPRESENTATIVES = 6
+
+
+def _normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return matrix / norms
+
+
+class MiniBatchKMeans:
+    """
+    k-means por mini-lotes (Sculley, 2010) sobre vectores normalizados: se
+    asigna por producto punto y los centroides se renormalizan tras cada paso.
+    """
+
+    def __init__(self, k, batch_size=1024, max_iter=300, tol=1e-4, patience=10, seed=0, init_sample=None):
+        """
+        Para antes de ``max_iter`` si la similitud media de los mini-lotes
+        (suavizada) no mejora más de ``tol`` durante ``patience`` pasos.
+        """
+        self.k = k
+        self.batch_size = batch_size
+        self.max_iter = max_iter
+        self.tol = tol
+        self.patience = patience
+        # Como en scikit-learn: muestra pequeña para k-means++ (cada centro recorre toda la muestra)
+        self.init_sample = init_sample or max(3 * batch_size, 10 * k)
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        self.centroids = None
+        self.counts = None
+        self.iteration = 0
+        self.stalled = 0
+        self.smoothed = self.best = None
+
+    @property
+    def params(self):
+        return {'k': self.k, 'batch_size': self.batch_size, 'seed': self.seed}
+
+    def _sample(self, n_rows, size):
+        if size >= n_rows:
+            return np.arange(n_rows)
+        # Ordenados: lectura secuencial del memmap
+        return np.sort(self.rng.choice(n_rows, size, replace=False))
+
+    def init_centroids(self, matrix):
+        """k-means++ sobre una muestra de ``init_sample`` filas."""
+        sample = np.asarray(matrix[self._sample(len(matrix), self.init_sample)], dtype=np.float32)
+        k = min(self.k, len(sample))
+        centroids = np.empty((k, sample.shape[1]), dtype=np.float32)
+        centroids[0] = sample[self.rng.integers(len(sample))]
+        # Distancia euclídea al cuadrado entre vectores unitarios: 2 - 2·coseno
+        distances = np.maximum(2 - 2 * sample @ centroids[0], 0)
+        for i in range(1, k):
+            total = distances.sum()
+            choice = self.rng.choice(len(sample), p=distances / total) if total > 0 else self.rng.integers(len(sample))
+            centroids[i] = sample[choice]
+            distances = np.minimum(distances, np.maximum(2 - 2 * sample @ centroids[i], 0))
+        self.k = k
+        self.centroids = centroids
+        self.counts = np.zeros(k, dtype=np.int64)
+
+    def partial_fit(self, batch):
+        """Un paso con el mini-lote ``batch``; devuelve su similitud media con los centroides."""
+        scores = batch @ self.centroids.T
+        labels = np.argmax(scores, axis=1)
+        objective = float(scores[np.arange(len(batch)), labels].mean())
+        batch_counts = np.bincount(labels, minlength=self.k)
+        # Suma por grupo como producto con una matriz one-hot (mucho más rápido que np.add.at)
+        assignment = np.zeros((self.k, len(batch)), dtype=np.float32)
+        assignment[labels, np.arange(len(batch))] = 1
+        sums = assignment @ batch
+        touched = batch_counts > 0
+        self.counts[touched] += batch_counts[touched]
+        # Tasa de aprendizaje 1/cuenta por centroide: media móvil de lo que se le asignó
+        rate = (batch_counts[touched] / self.counts[touched])[:, None].astype(np.float32)
+        means = sums[touched] / batch_counts[touched][:, None]
+        self.centroids[touched] = _normalize((1 - rate) * self.centroids[touched] + rate * means)
+        self.iteration += 1
+        return objective
+
+    def fit(self, matrix, checkpoint=None, checkpoint_every=20, callback=None):
+        """Entrena desde donde se quedó (``restore``); guarda ``checkpoint`` cada ``checkpoint_every`` pasos."""
+        if self.centroids is None:
+            with instrumentation.span('clustering.init'):
+                self.init_centroids(matrix)
+        # Media móvil con el peso de un mini-lote sobre el catálogo (como scikit-learn)
+        alpha = min(1.0, 2 * self.batch_size / (len(matrix) + 1))
+        while self.iteration < self.max_iter and self.stalled < self.patience:
+            batch = np.asarray(matrix[self._sample(len(matrix), self.batch_size)], dtype=np.float32)
+            objective = self.partial_fit(batch)
+            self.smoothed = objective if self.smoothed is None else (1 - alpha) * self.smoothed + alpha * objective
+            if self.best is None or self.smoothed > self.best + self.tol:
+                self.best = self.smoothed
+                self.stalled = 0
+            else:
+                self.stalled += 1
+            if callback is not None:
+                callback(self.iteration, self.smoothed)
+            if checkpoint and self.iteration % checkpoint_every == 0:
+                self.save(checkpoint)
+        if checkpoint:
+            self.save(checkpoint)
+        return self
+
+    def predict(self, matrix, chunk_size=8192):
+        """(grupo, similitud con su centroide) de cada fila, recorriendo la matriz por bloques."""
+        labels = np.empty(len(matrix), dtype=np.int32)
+        similarities = np.empty(len(matrix), dtype=np.float32)
+        for start in range(0, len(matrix), chunk_size):
+            scores = np.asarray(matrix[start:start + chunk_size], dtype=np.float32) @ self.centroids.T
+            labels[start:start + chunk_size] = np.argmax(scores, axis=1)
+            similarities[start:start + chunk_size] = scores[np.arange(len(scores)), labels[start:start + chunk_size]]
+        return labels, similarities
+
+    def save(self, path):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as file:
+            np.savez(
+                file,
+                centroids=self.centroids,
+                counts=self.counts,
+                state=np.array([self.iteration, self.stalled], dtype=np.int64),
+                objective=np.array([self.smoothed, self.best], dtype=np.float64),
+                params=np.array(json.dumps(self.params)),
+                rng=np.array(json.dumps(self.rng.bit_generator.state)),
+            )
+        os.replace(tmp_path, path)
+
+    def restore(self, path):
+        """Continúa desde un checkpoint; False si no existe o es de otros parámetros."""
+        try:
+            data = np.load(path, allow_pickle=False)
+        except OSError:
+            return False
+        with data:
+            if json.loads(str(data['params'])) != self.params:
+                return False
+            self.centroids = data['centroids']
+            self.counts = data['counts']
+            self.iteration, self.stalled = (int(value) for value in data['state'])
+            self.smoothed, self.best = (float(value) for value in data['objective'])
+            self.rng.bit_generator.state = json.loads(str(data['rng']))
+        self.k = len(self.centroids)
+        return True
+
+
+def representatives(labels, similarities, k, count=REPRESENTATIVES):
+    """Por grupo, las filas más cercanas a su centroide (índices de fila)."""
+    order = np.lexsort((-similarities, labels))  # por grupo y, dentro, por similitud descendente
+    starts = np.searchsorted(labels[order], np.arange(k))
+    ends = np.searchsorted(labels[order], np.arange(k), side='right')
+    return [order[start:min(end, start + count)] for start, end in zip(starts, ends)]
+
+
+@transaction.atomic
+def store_clusters(model, ids, labels, similarities, generation, chunk_size=5000):
+    """Reemplaza los grupos guardados y asigna Movie.cluster; devuelve los Cluster creados."""
+    Movie.objects.exclude(cluster=None).update(cluster=None)
+    Cluster.objects.all().delete()
+
+    sizes = np.bincount(labels, minlength=model.k)
+    best = representatives(labels, similarities, model.k)
+    used = [label for label in range(model.k) if sizes[label]]
+    clusters = Cluster.objects.bulk_create([
+        Cluster(
+            centroid=model.centroids[label].astype(np.float32).tobytes(),
+            size=int(sizes[label]),
+            representative_ids=ids[best[label]].tolist(),
+            generation=generation,
+        )
+        for label in used
+    ])
+    order = np.argsort(labels, kind='stable')
+    bounds = np.searchsorted(labels[order], np.arange(model.k + 1))
+    for label, cluster in zip(used, clusters):
+        members = ids[order[bounds[label]:bounds[label + 1]]].tolist()
+        for start in range(0, len(members), chunk_size):
+            Movie.objects.filter(pk__in=members[start:start + chunk_size]).update(cluster=cluster)
+
+    # Etiqueta legible: los tres géneros más característicos de cada grupo
+    # (frecuencia en el grupo × rareza en el catálogo, para que no todo sea "Drama")
+    rows = (MovieGenre.objects.filter(movie__cluster__isnull=False)
+            .values('movie__cluster', 'genre__name').annotate(n=Count('id')))
+    rows = list(rows)
+    totals = Counter()
+    for row in rows:
+        totals[row['genre__name']] += row['n']
+    catalog = len(ids)
+    weights = defaultdict(dict)
+    for row in rows:
+        weights[row['movie__cluster']][row['genre__name']] = row['n'] * math.log(1 + catalog / totals[row['genre__name']])
+    for cluster in clusters:
+        names = sorted(weights[cluster.pk], key=weights[cluster.pk].get, reverse=True)[:3]
+        cluster.label = ', '.join(names)[:200]
+    Cluster.objects.bulk_update(clusters, ['label'])
+
+    IndexGeneration.bump(IndexGeneration.CLUSTERS)
+    return clusters
+
+
+# --- Filtro de candidatos para recommend_movie ---
+
+class ClusterSet:
+    """Centroides y miembros de cada grupo en memoria, para elegir candidatos por prompt."""
+
+    def __init__(self, centroids, members, unassigned):
+        self.centroids = centroids
+        self.members = members
+        self.unassigned = unassigned
+
+    @classmethod
+    def load(cls):
+        clusters = list(Cluster.objects.values_list('id', 'centroid'))
+        if not clusters:
+            return None
+        centroids = np.stack([np.frombuffer(centroid, dtype=np.float32) for _, centroid in clusters])
+        position = {cluster_id: i for i, (cluster_id, _) in enumerate(clusters)}
+        ids, labels = [], []
+        for movie_id, cluster_id in Movie.objects.values_list('id', 'cluster_id').iterator(chunk_size=10000):
+            ids.append(movie_id)
+            labels.append(position.get(cluster_id, -1))
+        ids = np.asarray(ids, dtype=np.int64)
+        labels = np.asarray(labels, dtype=np.int64)
+        order = np.argsort(labels, kind='stable')
+        bounds = np.searchsorted(labels[order], np.arange(-1, len(clusters) + 1))
+        members = [ids[order[bounds[i + 1]:bounds[i + 2]]] for i in range(len(clusters))]
+        return cls(centroids, members, ids[order[bounds[0]:bounds[1]]])
+
+    def candidate_ids(self, query, probes):
+        """Películas de los ``probes`` grupos más parecidos a ``query`` y las que no tienen grupo."""
+        scores = self.centroids @ np.asarray(query, dtype=np.float32)
+        nearest = np.argsort(-scores)[:probes]
+        return np.concatenate([self.members[i] for i in nearest] + [self.unassigned])
+
+
+_cluster_set = None
+_cluster_key = None
+_cluster_lock = threading.Lock()
+
+
+def get_cluster_set(embeddings_generation=None, clusters_generation=None):
+    """ClusterSet vigente; se recarga si cambiaron los grupos o los embeddings (películas nuevas)."""
+    global _cluster_set, _cluster_key
+    if embeddings_generation is None:
+        embeddings_generation = IndexGeneration.current()
+    if clusters_generation is None:
+        clusters_generation = IndexGeneration.current(IndexGeneration.CLUSTERS)
+    key = (clusters_generation, embeddings_generation)
+    if key != _cluster_key:
+        with _cluster_lock:
+            if key != _cluster_key:
+                with instrumentation.span('clusters.load'):
+                    _cluster_set = ClusterSet.load()
+                _cluster_key = key
+    return _cluster_set
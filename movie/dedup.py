@@ -0,0 +1,335 @@
+"""
+Detección de películas casi duplicadas con LSH (locality-sensitive hashing).
+
+Dos firmas por película, cada una partida en bandas; dos películas son
+candidatas si coinciden en alguna banda completa (caen en el mismo bucket):
+
+- Embeddings: bits de signo contra hiperplanos aleatorios (SimHash). La
+  probabilidad de coincidir en un bit es 1 - ángulo/π, así que solo las
+  parejas con coseno alto comparten bandas.
+- Títulos: MinHash de los 3-gramas del título normalizado; la probabilidad
+  de coincidir en un valor es la similitud de Jaccard.
+
+Las tablas de buckets son, por banda, las claves ordenadas (búsqueda con
+``searchsorted``), y los candidatos salen de recorrer claves iguales: nunca
+se comparan todas las parejas. Los buckets con más de ``max_bucket``
+miembros se ignoran para que un valor muy repetido no vuelva cuadrático el
+proceso. Cada candidata se verifica después con el coseno y el Jaccard
+exactos.
+"""
+import re
+import unicodedata
+import zlib
+from collections import namedtuple
+
+import numpy as np
+
+from . import instrumentation
+
+EMB_BANDS = 32
+EMB_BITS = 20           # bits por banda
+EMB_THRESHOLD = 0.95    # coseno mínimo para considerar dos películas duplicadas
+TITLE_BANDS = 16
+TITLE_ROWS = 4          # valores MinHash por banda (16 x 4 = 64 permutaciones)
+TITLE_THRESHOLD = 0.8   # Jaccard mínimo entre 3-gramas de los títulos
+MAX_BUCKET = 200
+SEED = 2566
+
+ARTICLES = {'the', 'a', 'an', 'el', 'la', 'los', 'las', 'le', 'les', 'il', 'lo', 'der', 'die', 'das'}
+
+DuplicatePair = namedtuple('DuplicatePair', 'movie_id other_id cosine title_similarity')
+
+_KEY_MULTIPLIER = np.uint64(1000003)
+
+
+def normalize_title(title):
+    """'The Matrix (1999)' / 'Matrix, The' -> 'matrix 1999' / 'matrix'."""
+    title = unicodedata.normalize('NFKD', title or '')
+    title = ''.join(char for char in title if not unicodedata.combining(char)).lower()
+    words = re.sub(r'[^\w\s]', ' ', title).split()
+    while len(words) > 1 and words[0] in ARTICLES:
+        words.pop(0)
+    while len(words) > 1 and words[-1] in ARTICLES:
+        words.pop()
+    return ' '.join(words)
+
+
+def title_shingles(title, size=3):
+    text = f" {normalize_title(title)} "
+    if len(text) <= size:
+        return {text}
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def jaccard(a, b):
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class LSHIndex:
+    """
+    Tablas de buckets de una firma en bandas: ``keys`` (N, bandas) uint64.
+
+    Por cada banda guarda las claves ordenadas y la fila de cada una.
+    """
+
+    def __init__(self, keys, max_bucket=MAX_BUCKET):
+        self.max_bucket = max_bucket
+        self.size = len(keys)
+        self.tables = []
+        for band in range(keys.shape[1] if keys.ndim == 2 else 0):
+            order = np.argsort(keys[:, band], kind='stable')
+            self.tables.append((keys[order, band], order))
+
+    def candidate_pairs(self):
+        """Array (P, 2) de filas (i < j) que comparten al menos un bucket."""
+        encoded = []
+        for sorted_keys, order in self.tables:
+            if len(sorted_keys) < 2:
+                continue
+            starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+            sizes = np.diff(np.r_[starts, len(sorted_keys)])
+            shared = (sizes >= 2) & (sizes <= self.max_bucket)
+            # Todos los buckets del mismo tamaño a la vez: (buckets, tamaño) -> parejas
+            for size in np.unique(sizes[shared]).tolist():
+                bucket_starts = starts[sizes == size]
+                members = np.sort(order[bucket_starts[:, None] + np.arange(size)], axis=1).astype(np.int64)
+                i, j = np.triu_indices(size, 1)
+                encoded.append((members[:, i] * self.size + members[:, j]).ravel())
+        if not encoded:
+            return np.zeros((0, 2), dtype=np.int64)
+        pairs = np.unique(np.concatenate(encoded))
+        return np.stack([pairs // self.size, pairs % self.size], axis=1)
+
+    def query(self, keys):
+        """Filas que comparten algún bucket con la firma ``keys`` (una fila)."""
+        rows = set()
+        for band, (sorted_keys, order) in enumerate(self.tables):
+            start = int(np.searchsorted(sorted_keys, keys[band], side='left'))
+            stop = int(np.searchsorted(sorted_keys, keys[band], side='right'))
+            if 0 < stop - start <= self.max_bucket:
+                rows.update(order[start:stop].tolist())
+        return rows
+
+
+def _band_keys(values, bands):
+    """(N, bandas * filas) enteros -> (N, bandas) claves uint64 (hash polinómico por banda)."""
+    values = values.astype(np.uint64).reshape(len(values), bands, -1)
+    keys = np.zeros(values.shape[:2], dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        for column in range(values.shape[2]):
+            keys = keys * _KEY_MULTIPLIER ^ values[:, :, column]
+    return keys
+
+
+# --- Embeddings ---
+
+def hyperplanes(dim, bands=EMB_BANDS, bits=EMB_BITS, seed=SEED):
+    return np.random.default_rng(seed).standard_normal((dim, bands * bits)).astype(np.float32)
+
+
+def embedding_keys(matrix, planes, bands=EMB_BANDS, chunk_size=8192):
+    """Claves (N, bandas) de la matriz (N, D), calculadas por bloques (sirve con memmap)."""
+    bits = planes.shape[1] // bands
+    weights = (np.uint64(1) << np.arange(bits, dtype=np.uint64))
+    keys = np.zeros((len(matrix), bands), dtype=np.uint64)
+    for start in range(0, len(matrix), chunk_size):
+        signs = (np.asarray(matrix[start:start + chunk_size], dtype=np.float32) @ planes) > 0
+        signs = signs.reshape(len(signs), bands, bits).astype(np.uint64)
+        keys[start:start + chunk_size] = (signs * weights).sum(axis=2, dtype=np.uint64)
+    return keys
+
+
+# --- Títulos ---
+
+def _minhash_params(num_perm, seed=SEED):
+    rng = np.random.default_rng(seed)
+    a = rng.integers(0, 2**63, num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)  # impares
+    b = rng.integers(0, 2**63, num_perm, dtype=np.uint64)
+    return a, b
+
+
+def minhash_many(shingle_sets, params, chunk_size=2000):
+    """Firmas MinHash (N, permutaciones) de varios conjuntos de 3-gramas, por bloques."""
+    a, b = params
+    signatures = np.zeros((len(shingle_sets), len(a)), dtype=np.uint64)
+    for start in range(0, len(shingle_sets), chunk_size):
+        chunk = shingle_sets[start:start + chunk_size]
+        lengths = np.fromiter(map(len, chunk), dtype=np.int64, count=len(chunk))
+        hashes = np.fromiter((zlib.crc32(shingle.encode('utf-8')) for shingles in chunk for shingle in shingles),
+                             dtype=np.uint64, count=int(lengths.sum()))
+        with np.errstate(over='ignore'):
+            # Hash multiply-shift: (a * x + b) mod 2**64, bits altos; evita el módulo primo
+            values = (hashes[:, None] * a + b) >> np.uint64(32)
+        offsets = np.r_[0, np.cumsum(lengths)[:-1]]
+        signatures[start:start + len(chunk)] = np.minimum.reduceat(values, offsets, axis=0)
+    return signatures
+
+
+def minhash(shingles, params):
+    return minhash_many([shingles], params)[0]
+
+
+def same_year(year, other):
+    """False solo si ambos años se conocen y son distintos (como ``dedup_movies --merge``)."""
+    return not year or not other or year == other
+
+
+class TitleIndex:
+    """
+    MinHash LSH sobre títulos: ``similar(title)`` da los casi duplicados.
+
+    Se construye una vez por importación y se consulta por cada fila nueva;
+    las películas creadas durante la importación se añaden con ``add()`` y
+    se comparan directamente (son pocas frente al catálogo).
+    """
+
+    def __init__(self, ids, titles, years=None, bands=TITLE_BANDS, rows=TITLE_ROWS, max_bucket=MAX_BUCKET):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.titles = list(titles)
+        self.years = list(years) if years is not None else [None] * len(self.titles)
+        self.bands = bands
+        self.params = _minhash_params(bands * rows)
+        self.signatures = minhash_many([title_shingles(title) for title in self.titles], self.params)
+        self.lsh = LSHIndex(_band_keys(self.signatures, bands), max_bucket)
+        self.added = []
+
+    @classmethod
+    def from_queryset(cls, queryset, **kwargs):
+        ids, titles, years = [], [], []
+        for movie_id, title, year in queryset.values_list('id', 'title', 'year').iterator(chunk_size=5000):
+            ids.append(movie_id)
+            titles.append(title)
+            years.append(year)
+        return cls(ids, titles, years, **kwargs)
+
+    def add(self, movie_id, title, year=None):
+        self.added.append((movie_id, title_shingles(title), year))
+
+    def similar(self, title, threshold=TITLE_THRESHOLD, year=None):
+        """
+        [(movie_id, jaccard)] de mayor a menor similitud. Con ``year`` se
+        descartan las de otro año: "Rocky II" y "Rocky III" se parecen más
+        que el umbral, pero son secuelas, no duplicados.
+        """
+        shingles = title_shingles(title)
+        keys = _band_keys(minhash(shingles, self.params)[None, :], self.bands)[0]
+        matches = []
+        for row in self.lsh.query(keys):
+            if not same_year(year, self.years[row]):
+                continue
+            similarity = jaccard(shingles, title_shingles(self.titles[row]))
+            if similarity >= threshold:
+                matches.append((int(self.ids[row]), similarity))
+        for movie_id, other, other_year in self.added:
+            if not same_year(year, other_year):
+                continue
+            similarity = jaccard(shingles, other)
+            if similarity >= threshold:
+                matches.append((movie_id, similarity))
+        return sorted(matches, key=lambda match: -match[1])
+
+    def similar_pairs(self, threshold=TITLE_THRESHOLD, chunk_size=100_000):
+        """
+        (movie_id, movie_id, jaccard) de las parejas candidatas del LSH que
+        superan ``threshold``. La fracción de valores MinHash iguales estima
+        el Jaccard y descarta en bloque las claramente distintas antes de
+        calcular el exacto.
+        """
+        pairs = self.lsh.candidate_pairs()
+        margin = 0.2
+        for start in range(0, len(pairs), chunk_size):
+            chunk = pairs[start:start + chunk_size]
+            estimate = (self.signatures[chunk[:, 0]] == self.signatures[chunk[:, 1]]).mean(axis=1)
+            for row, other in chunk[estimate >= threshold - margin].tolist():
+                similarity = jaccard(title_shingles(self.titles[row]), title_shingles(self.titles[other]))
+                if similarity >= threshold:
+                    yield int(self.ids[row]), int(self.ids[other]), similarity
+
+
+# --- Catálogo completo ---
+
+def pair_cosines(matrix, pairs, chunk_size=4096):
+    """Coseno de cada pareja de filas de una matriz ya normalizada, por bloques."""
+    cosines = np.zeros(len(pairs), dtype=np.float32)
+    for start in range(0, len(pairs), chunk_size):
+        chunk = pairs[start:start + chunk_size]
+        cosines[start:start + chunk_size] = np.einsum('ij,ij->i', matrix[chunk[:, 0]], matrix[chunk[:, 1]])
+    return cosines
+
+
+def find_duplicates(queryset=None, emb_threshold=EMB_THRESHOLD, title_threshold=TITLE_THRESHOLD,
+                    use_embeddings=True, use_titles=True):
+    """
+    Parejas de películas casi duplicadas: coseno de embeddings >= ``emb_threshold``
+    o Jaccard de títulos >= ``title_threshold``.
+
+    Los embeddings salen del índice del motor de recomendación (mapeado
+    desde disco). Cada candidata del LSH se verifica con la medida exacta y,
+    para el informe, a las que pasan se les calcula también la otra.
+    """
+    from . import scoring
+    from .models import Movie
+
+    queryset = Movie.objects.all() if queryset is None else queryset
+    found = {}  # (id, id) -> [coseno, jaccard]
+    index = scoring.get_engine().index if use_embeddings else None
+
+    if index is not None and len(index) and index.dim:
+        with instrumentation.span('dedup.embeddings'):
+            pairs = LSHIndex(embedding_keys(index.matrix, hyperplanes(index.dim))).candidate_pairs()
+            cosines = pair_cosines(index.matrix, pairs)
+            keep = cosines >= emb_threshold
+            for movie_id, other_id, cosine in zip(index.ids[pairs[keep, 0]].tolist(),
+                                                  index.ids[pairs[keep, 1]].tolist(), cosines[keep].tolist()):
+                found[min(movie_id, other_id), max(movie_id, other_id)] = [cosine, None]
+
+    if use_titles:
+        with instrumentation.span('dedup.titles'):
+            titles = TitleIndex.from_queryset(queryset)
+            for movie_id, other_id, similarity in titles.similar_pairs(title_threshold):
+                found.setdefault((min(movie_id, other_id), max(movie_id, other_id)), [None, None])[1] = similarity
+
+    # Completar la medida que falte, solo para las parejas encontradas
+    involved = sorted({movie_id for pair in found for movie_id in pair})
+    current = {}
+    for start in range(0, len(involved), 5000):
+        current.update(queryset.filter(pk__in=involved[start:start + 5000]).values_list('id', 'title'))
+    emb_rows = {}
+    if index is not None and len(index) and index.dim:
+        wanted = set(involved)
+        emb_rows = {movie_id: row for row, movie_id in enumerate(index.ids.tolist()) if movie_id in wanted}
+
+    duplicates = []
+    with instrumentation.span('dedup.verify'):
+        for (movie_id, other_id), (cosine, similarity) in sorted(found.items()):
+            if movie_id not in current or other_id not in current:
+                continue  # fuera del queryset o borrada mientras tanto
+            if cosine is None and movie_id in emb_rows and other_id in emb_rows:
+                cosine = float(np.dot(index.matrix[emb_rows[movie_id]], index.matrix[emb_rows[other_id]]))
+            if similarity is None:
+                similarity = jaccard(title_shingles(current[movie_id]), title_shingles(current[other_id]))
+            duplicates.append(DuplicatePair(movie_id, other_id, cosine, similarity))
+    return duplicates
+
+
+def group_duplicates(pairs):
+    """Agrupa parejas transitivamente (union-find): [[id, id, ...], ...] ordenados por id."""
+    parent = {}
+
+    def find(x):
+        parent.setdefault(x, x)
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for pair in pairs:
+        a, b = find(pair.movie_id), find(pair.other_id)
+        if a != b:
+            parent[max(a, b)] = min(a, b)
+    groups = {}
+    for movie_id in parent:
+        groups.setdefault(find(movie_id), []).append(movie_id)
+    return [sorted(group) for group in sorted(groups.values(), key=min)]
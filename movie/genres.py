@@ -0,0 +1,59 @@
+"""
+Normalización del campo de texto ``Movie.genre`` a las tablas Genre/MovieGenre.
+
+El texto sigue siendo la fuente (se edita en el admin y lo cargan los
+comandos); estas funciones mantienen la tabla intermedia sincronizada.
+"""
+import re
+
+from django.utils.text import slugify
+
+from .models import Genre, MovieGenre
+
+GENRE_SEPARATORS = re.compile(r'[,/|;]')
+
+
+def parse_genres(raw):
+    """'Animation, Comedy/Short' -> [('animation', 'Animation'), ('comedy', 'Comedy'), ...]"""
+    parsed = []
+    seen = set()
+    for part in GENRE_SEPARATORS.split(raw or ''):
+        name = part.strip()
+        slug = slugify(name)
+        if slug and slug not in seen:
+            seen.add(slug)
+            parsed.append((slug, name))
+    return parsed
+
+
+def get_or_create_genres(parsed):
+    """Devuelve {slug: Genre} creando en bloque los que falten."""
+    names = dict(parsed)
+    genres = {genre.slug: genre for genre in Genre.objects.filter(slug__in=names)}
+    missing = [Genre(slug=slug, name=name) for slug, name in names.items() if slug not in genres]
+    if missing:
+        Genre.objects.bulk_create(missing, ignore_conflicts=True)
+        genres.update((genre.slug, genre) for genre in Genre.objects.filter(slug__in=[g.slug for g in missing]))
+    return genres
+
+
+def sync_genres(movies):
+    """Reconstruye las filas MovieGenre de las películas dadas (ya guardadas)."""
+    movies = [movie for movie in movies if movie.pk is not None]
+    if not movies:
+        return
+    parsed = {movie.pk: parse_genres(movie.genre) for movie in movies}
+    genres = get_or_create_genres(pair for pairs in parsed.values() for pair in pairs)
+    MovieGenre.objects.filter(movie_id__in=parsed).delete()
+    MovieGenre.objects.bulk_create(
+        [
+            MovieGenre(movie_id=movie_id, genre=genres[slug], position=position)
+            for movie_id, pairs in parsed.items()
+            for position, (slug, _) in enumerate(pairs)
+        ],
+        batch_size=500,
+    )
+
+
+def sync_movie_genres(movie):
+    sync_genres([movie])
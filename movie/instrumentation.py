@@ -0,0 +1,238 @@
+"""
+Spans de tiempo ligeros y métricas en proceso para las rutas calientes.
+
+Uso:
+
+    from movie import instrumentation
+
+    with instrumentation.span('embedding'):
+        prompt_emb = get_embedding(prompt)
+
+Si no hay una traza activa (instrumentación desactivada), ``span`` devuelve
+un context manager vacío y compartido, así que el costo es una sola lectura
+de ``ContextVar``.
+"""
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+
+_current_trace = contextvars.ContextVar('movie_trace', default=None)
+
+# Límites superiores (en ms) de los buckets del histograma
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ('trace', 'name', 'start')
+
+    def __init__(self, trace, name):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.trace.add(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Trace:
+    """Tiempos y contadores acumulados durante una petición o un comando."""
+
+    def __init__(self, label):
+        self.label = label
+        self.spans = {}
+        self.counters = {}
+        self.started = time.perf_counter()
+        self.total = None
+
+    def add(self, name, seconds):
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def incr(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def query_wrapper(self, execute, sql, params, many, context):
+        """
+        ``execute_wrapper`` de Django: cuenta y cronometra cada consulta SQL
+        y mide lo que se lee de ella (filas y bytes, ver ``_count_fetches``).
+        """
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.add('sql', time.perf_counter() - start)
+            self.incr('sql.queries')
+            _count_fetches(self, context['cursor'])
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+
+    def server_timing(self):
+        """Valor para la cabecera ``Server-Timing`` (duraciones en ms)."""
+        parts = []
+        for name, seconds in self.spans.items():
+            if name == 'sql':
+                queries = self.counters.get('sql.queries', 0)
+                fetched = self.counters.get('sql.bytes', 0) / 1024
+                parts.append(f'sql;desc="{queries} queries, {fetched:.1f} KB";dur={seconds * 1000:.1f}')
+            else:
+                parts.append(f'{name};dur={seconds * 1000:.1f}')
+        if self.total is not None:
+            parts.append(f'total;dur={self.total * 1000:.1f}')
+        return ', '.join(parts)
+
+    def summary(self):
+        """Resumen legible para la salida de los management commands."""
+        lines = [f"⏱  {self.label}: total {(self.total or 0) * 1000:.1f} ms"]
+        for name, seconds in sorted(self.spans.items(), key=lambda item: -item[1]):
+            lines.append(f"   {name:<24} {seconds * 1000:10.1f} ms")
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"   {name:<24} {value:10d}")
+        return '\n'.join(lines)
+
+
+def _row_bytes(row):
+    # Aproximado: largo de textos y binarios (caracteres, no bytes UTF-8); 8 por número
+    return sum(len(value) if isinstance(value, (bytes, str, memoryview)) else 8
+               for value in row if value is not None)
+
+
+def _count_fetches(trace, cursor):
+    """
+    Envuelve fetchone/fetchmany/fetchall del cursor de Django para sumar
+    ``sql.rows`` y ``sql.bytes`` a medida que el ORM lee los resultados.
+    """
+    if getattr(cursor, '_movie_trace', None) is trace:
+        return
+    cursor._movie_trace = trace
+    fetchone, fetchmany, fetchall = cursor.fetchone, cursor.fetchmany, cursor.fetchall
+
+    def count(rows):
+        trace.incr('sql.rows', len(rows))
+        trace.incr('sql.bytes', sum(_row_bytes(row) for row in rows))
+        return rows
+
+    def counting_fetchone():
+        row = fetchone()
+        if row is not None:
+            count([row])
+        return row
+
+    # Atributos de la instancia: tienen prioridad sobre el __getattr__ de CursorWrapper
+    cursor.fetchone = counting_fetchone
+    cursor.fetchmany = lambda *args, **kwargs: count(fetchmany(*args, **kwargs))
+    cursor.fetchall = lambda: count(fetchall())
+
+
+class Histogram:
+    __slots__ = ('counts', 'count', 'sum')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, ms):
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.sum += ms
+
+    def as_dict(self):
+        buckets = {str(le): n for le, n in zip(BUCKETS_MS, self.counts)}
+        buckets['+Inf'] = self.counts[-1]
+        return {'count': self.count, 'sum_ms': round(self.sum, 3), 'buckets': buckets}
+
+
+class Registry:
+    """Histogramas agregados por ``<etiqueta>:<span>`` para todo el proceso."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+
+    def record(self, trace):
+        with self._lock:
+            observations = dict(trace.spans)
+            if trace.total is not None:
+                observations['total'] = trace.total
+            for name, seconds in observations.items():
+                key = f'{trace.label}:{name}'
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = self._histograms[key] = Histogram()
+                histogram.observe(seconds * 1000)
+            for name, value in trace.counters.items():
+                key = f'{trace.label}:{name}'
+                self._counters[key] = self._counters.get(key, 0) + value
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'histograms': {key: h.as_dict() for key, h in sorted(self._histograms.items())},
+                'counters': dict(sorted(self._counters.items())),
+            }
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+registry = Registry()
+
+
+def span(name):
+    """Cronometra el bloque ``with`` dentro de la traza activa, si la hay."""
+    trace = _current_trace.get()
+    if trace is None:
+        return _NOOP_SPAN
+    return _Span(trace, name)
+
+
+def incr(name, value=1):
+    """Suma ``value`` al contador ``name`` de la traza activa, si la hay."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.incr(name, value)
+
+
+def active():
+    """Indica si hay una traza activa (útil para evitar trabajo extra)."""
+    return _current_trace.get() is not None
+
+
+@contextmanager
+def collect(label):
+    """Activa una traza, cuenta las consultas SQL y la registra al salir."""
+    trace = Trace(label)
+    token = _current_trace.set(trace)
+    try:
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(trace.query_wrapper))
+            yield trace
+    finally:
+        _current_trace.reset(token)
+        trace.finish()
+        registry.record(trace)
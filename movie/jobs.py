@@ -0,0 +1,200 @@
+"""
+Cola local de trabajos en la BD para refrescar embeddings, descripciones y pósters.
+
+- ``enqueue``: crea (o reutiliza) el trabajo pendiente de una película.
+- ``claim_batch``: el worker toma un lote de trabajos pendientes del mismo
+  tipo, empezando por el de mayor prioridad.
+- ``run_batch``: ejecuta el lote; los embeddings de todo el lote se piden en
+  una sola llamada a la API. Los fallos se reintentan con espera exponencial
+  hasta ``max_attempts``.
+"""
+import logging
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import ai, instrumentation, media
+from .models import Job, Movie
+from .signals import embeddings_changed
+
+logger = logging.getLogger('movie.jobs')
+
+DEFAULT_PRIORITIES = {
+    Job.EMBEDDING: 10,
+    Job.DESCRIPTION: 5,
+    Job.IMAGE: 0,
+}
+
+RETRY_BASE_DELAY = 30  # segundos; se duplica en cada intento
+STALE_AFTER = timedelta(minutes=30)  # RUNNING sin cambios por más tiempo = worker caído
+
+
+def enqueue(movie_id, kind, priority=None):
+    """Encola ``kind`` para la película, sin duplicar un trabajo pendiente."""
+    if priority is None:
+        priority = DEFAULT_PRIORITIES.get(kind, 0)
+    try:
+        with transaction.atomic():
+            job, created = Job.objects.get_or_create(
+                movie_id=movie_id, kind=kind, status=Job.PENDING,
+                defaults={'priority': priority},
+            )
+    except IntegrityError:
+        # Otro proceso lo encoló a la vez: el trabajo ya existe
+        return None
+    if not created and priority > job.priority:
+        Job.objects.filter(pk=job.pk).update(priority=priority)
+    return job
+
+
+def enqueue_on_commit(movie_id, kinds):
+    """Encola cuando la transacción actual se confirme (si se revierte, no se encola)."""
+    def callback():
+        for kind in kinds:
+            enqueue(movie_id, kind)
+    transaction.on_commit(callback)
+
+
+def claim_batch(worker_id, batch_size, kinds=None):
+    """Marca como RUNNING hasta ``batch_size`` trabajos pendientes del mismo tipo."""
+    now = timezone.now()
+    pending = Job.objects.filter(status=Job.PENDING, run_after__lte=now)
+    if kinds:
+        pending = pending.filter(kind__in=kinds)
+    first = pending.order_by('-priority', 'run_after', 'id').first()
+    if first is None:
+        return []
+    ids = list(pending.filter(kind=first.kind)
+               .order_by('-priority', 'run_after', 'id')
+               .values_list('id', flat=True)[:batch_size])
+    # El filtro status=PENDING evita tomar trabajos que otro worker ya reclamó
+    Job.objects.filter(id__in=ids, status=Job.PENDING).update(
+        status=Job.RUNNING, locked_by=worker_id, attempts=F('attempts') + 1, updated_at=now,
+    )
+    return list(Job.objects.filter(id__in=ids, status=Job.RUNNING, locked_by=worker_id).select_related('movie'))
+
+
+def requeue_stale():
+    """Devuelve a la cola (o marca FAILED) los trabajos de workers que murieron a mitad."""
+    cutoff = timezone.now() - STALE_AFTER
+    stale = list(Job.objects.filter(status=Job.RUNNING, updated_at__lt=cutoff))
+    for job in stale:
+        _fail(job, "Worker stopped before finishing the job")
+    return len(stale)
+
+
+def run_batch(jobs):
+    """Ejecuta un lote reclamado con ``claim_batch``; devuelve (hechos, fallidos)."""
+    if not jobs:
+        return 0, 0
+    handler = HANDLERS[jobs[0].kind]
+    with instrumentation.span(f'job.{jobs[0].kind}'):
+        try:
+            errors = handler(jobs)
+        except Exception as e:
+            logger.exception("%s batch of %d jobs failed", jobs[0].kind, len(jobs))
+            errors = {job.pk: e for job in jobs}
+
+    done = [job.pk for job in jobs if job.pk not in errors]
+    Job.objects.filter(pk__in=done).update(status=Job.DONE, locked_by='', last_error='', updated_at=timezone.now())
+    for job in jobs:
+        if job.pk in errors:
+            _fail(job, errors[job.pk])
+    return len(done), len(errors)
+
+
+def _fail(job, error):
+    now = timezone.now()
+    if job.attempts >= job.max_attempts:
+        Job.objects.filter(pk=job.pk).update(status=Job.FAILED, locked_by='', last_error=str(error), updated_at=now)
+        return
+    if Job.objects.filter(movie_id=job.movie_id, kind=job.kind, status=Job.PENDING).exists():
+        # Ya hay un trabajo más nuevo pendiente para la misma película: ese lo reemplaza
+        job.delete()
+        return
+    Job.objects.filter(pk=job.pk).update(
+        status=Job.PENDING, locked_by='', last_error=str(error), updated_at=now,
+        run_after=now + timedelta(seconds=RETRY_BASE_DELAY * 2 ** (job.attempts - 1)),
+    )
+
+
+# --- Handlers: reciben el lote y devuelven {job_id: excepción} de los que fallaron ---
+
+def refresh_embeddings(jobs):
+    """
+    Un solo request a la API de embeddings para todo el lote. Si el lote
+    falla, se reintenta película por película: un texto que la API rechaza
+    no debe hacer fallar a los demás.
+    """
+    errors = {}
+    valid = []
+    for job in jobs:
+        if job.movie.description and job.movie.description.strip():
+            valid.append(job)
+        else:
+            errors[job.pk] = ValueError("Movie has no description to embed")
+    if not valid:
+        return errors
+
+    try:
+        embeddings = ai.get_embeddings([job.movie.description for job in valid])
+    except Exception as e:
+        if len(valid) == 1:
+            errors[valid[0].pk] = e
+            return errors
+        logger.warning("Embedding batch of %d jobs failed (%s); retrying one by one", len(valid), e)
+        embedded, embeddings = [], []
+        for job in valid:
+            try:
+                embeddings.append(ai.get_embeddings([job.movie.description])[0])
+                embedded.append(job)
+            except Exception as e:
+                errors[job.pk] = e
+        valid = embedded
+
+    movies = [job.movie for job in valid]
+    for movie, emb in zip(movies, embeddings):
+        movie.emb = emb.tobytes()
+    if movies:
+        Movie.objects.bulk_update(movies, ['emb'])
+        embeddings_changed()
+    return errors
+
+
+def refresh_descriptions(jobs):
+    # La API de chat no acepta varios prompts por llamada: una por película
+    errors = {}
+    for job in jobs:
+        movie = job.movie
+        try:
+            movie.description = ai.describe_movie(movie.title, movie.description)
+            movie.save(update_fields=['description'])  # encola el embedding nuevo
+        except Exception as e:
+            errors[job.pk] = e
+    return errors
+
+
+def refresh_images(jobs):
+    errors = {}
+    images_folder = os.path.join(settings.MEDIA_ROOT, 'movie', 'images')
+    for job in jobs:
+        movie = job.movie
+        try:
+            movie.image = ai.generate_poster(movie.title, images_folder)
+            movie.save(update_fields=['image'])
+        except Exception as e:
+            errors[job.pk] = e
+    # El póster nuevo puede reemplazar uno con el mismo nombre: hash y tamaño nuevos
+    media.update_manifest([job.movie.image.name for job in jobs if job.pk not in errors])
+    return errors
+
+
+HANDLERS = {
+    Job.EMBEDDING: refresh_embeddings,
+    Job.DESCRIPTION: refresh_descriptions,
+    Job.IMAGE: refresh_images,
+}
@@ -0,0 +1,55 @@
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from movie import instrumentation
+
+
+class MovieCommand(BaseCommand):
+    """
+    Base común para los management commands de la app movie.
+
+    Con MOVIE_INSTRUMENTATION activo, cada ejecución se mide con spans y
+    conteo de consultas, y al final se imprime un resumen en stderr.
+
+    Todos los comandos aceptan ``--profile [cprofile|sample]`` para guardar
+    un perfil de la ejecución en PROFILE_DIR.
+    """
+
+    @property
+    def command_name(self):
+        return self.__module__.rsplit('.', 1)[-1]
+
+    def create_parser(self, prog_name, subcommand, **kwargs):
+        parser = super().create_parser(prog_name, subcommand, **kwargs)
+        parser.add_argument(
+            "--profile",
+            nargs="?",
+            const="cprofile",
+            choices=("cprofile", "sample"),
+            help="Profile the run (cProfile by default, or 'sample') and save it under PROFILE_DIR.",
+        )
+        return parser
+
+    def execute(self, *args, **options):
+        mode = options.get('profile')
+        instrumented = getattr(settings, 'MOVIE_INSTRUMENTATION', False)
+        if not mode and not instrumented:
+            return super().execute(*args, **options)
+
+        trace = profile = None
+        with ExitStack() as stack:
+            if instrumented:
+                trace = stack.enter_context(instrumentation.collect(f'command.{self.command_name}'))
+            if mode:
+                from movie import profiling
+                profile = stack.enter_context(profiling.profile(self.command_name, mode))
+            result = super().execute(*args, **options)
+
+        if profile is not None:
+            self.stderr.write(profile.summary)
+            self.stderr.write(f"📄 Profile saved to {profile.path}")
+        if trace is not None:
+            self.stderr.write(trace.summary())
+        return result
@@ -1,11 +1,16 @@
-from django.core.management.base import BaseCommand
+from movie.management.base import MovieCommand
 from movie.models import Movie
+from movie import dedup, instrumentation
 import os
 import json
 
-class Command(BaseCommand):
+class Command(MovieCommand):
     help = 'Load movies from movie_descriptions.json into the Movie model'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--allow-duplicates', action='store_true',
+                            help='Create movies even if a near-duplicate title already exists')
+
     def handle(self, *args, **kwargs):
         # Construct the full path to the JSON file
         #Recuerde que la consola está ubicada en la carpeta DjangoProjectBase.
@@ -13,20 +18,31 @@ class Command(BaseCommand):
         json_file_path = 'movie/management/commands/movies.json' 
         
         # Load data from the JSON file
-        with open(json_file_path, 'r') as file:
+        with instrumentation.span('load_json'), open(json_file_path, 'r') as file:
             movies = json.load(file)
         
+        # Títulos ya cargados, para detectar casi duplicados (otra grafía, "The X" / "X, The"...)
+        with instrumentation.span('dedup.index'):
+            titles = dedup.TitleIndex.from_queryset(Movie.objects.all())
+
         # Add products to the database
         for i in range(100):
             movie = movies[i]
             exist = Movie.objects.filter(title = movie['title']).first() #Se asegura que la película no exista en la base de datos
+            if not exist and not kwargs['allow_duplicates']:
+                similar = titles.similar(movie['title'], year=movie['year'])
+                if similar:
+                    self.stdout.write(self.style.WARNING(
+                        f"Skipping '{movie['title']}': near-duplicate of movie {similar[0][0]} (similarity {similar[0][1]:.2f})"))
+                    continue
             if not exist:
                 try:              
-                    Movie.objects.create(title = movie['title'],
-                                        image = 'movie/images/default.jpg',
-                                        genre = movie['genre'],
-                                        year = movie['year'],
-                                        description = movie['plot'],)
+                    created = Movie.objects.create(title = movie['title'],
+                                                  image = 'movie/images/default.jpg',
+                                                  genre = movie['genre'],
+                                                  year = movie['year'],
+                                                  description = movie['plot'],)
+                    titles.add(created.pk, created.title, created.year)
                 except:
                     pass        
             else:
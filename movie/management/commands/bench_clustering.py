@@ -0,0 +1,90 @@
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from movie.clustering import ClusterSet, MiniBatchKMeans
+from movie.management.base import MovieCommand
+from movie.scoring import EmbeddingIndex, ScoringEngine
+
+
+class Command(MovieCommand):
+    help = "Benchmark mini-batch k-means and the cluster prefilter of /recommend/ on synthetic embeddings."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000],
+                            help="Synthetic catalog sizes (default: 10000 100000)")
+        parser.add_argument("--dim", type=int, default=1536, help="Embedding dimension (default: 1536)")
+        parser.add_argument("--topics", type=int, default=200, help="Latent topics in the synthetic data (default: 200)")
+        parser.add_argument("--k", type=int, help="Groups (default: sqrt(rows / 2))")
+        parser.add_argument("--probes", type=int, nargs="+", default=[2, 4, 8], help="Groups probed per query (default: 2 4 8)")
+        parser.add_argument("--queries", type=int, default=50, help="Queries for latency and recall (default: 50)")
+
+    def handle(self, *args, **options):
+        for rows in options["rows"]:
+            self.bench(rows, options)
+
+    def synthetic(self, rng, path, rows, dim, topics):
+        """Vectores agrupados en ``topics`` temas (como los embeddings reales), escritos por bloques."""
+        centers = rng.standard_normal((topics, dim), dtype=np.float32)
+        matrix = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=(rows, dim))
+        for start in range(0, rows, 8192):
+            stop = min(rows, start + 8192)
+            topic = rng.integers(topics, size=stop - start)
+            matrix[start:stop] = centers[topic] + 1.5 * rng.standard_normal((stop - start, dim), dtype=np.float32)
+        return matrix
+
+    def bench(self, rows, options):
+        rng = np.random.default_rng(0)
+        dim = options["dim"]
+        k = options["k"] or max(2, round(np.sqrt(rows / 2)))
+        with tempfile.TemporaryDirectory(prefix="moviereviews-clustering-") as directory:
+            matrix = self.synthetic(rng, f"{directory}/raw.npy", rows, dim, options["topics"])
+            index = EmbeddingIndex.from_array(np.arange(1, rows + 1), matrix, directory)
+            del matrix
+            self.stdout.write(f"\n📦 {rows} x {dim} float32, k={k}")
+
+            start = time.perf_counter()
+            model = MiniBatchKMeans(k).fit(index.matrix)
+            fit = time.perf_counter() - start
+            start = time.perf_counter()
+            labels, similarities = model.predict(index.matrix)
+            predict = time.perf_counter() - start
+            self.stdout.write(f"  fit {fit:.2f}s ({model.iteration} steps), assign {predict:.2f}s, "
+                              f"average similarity {similarities.mean():.3f}")
+
+            order = np.argsort(labels, kind="stable")
+            bounds = np.searchsorted(labels[order], np.arange(model.k + 1))
+            cluster_set = ClusterSet(model.centroids, [index.ids[order[a:b]] for a, b in zip(bounds, bounds[1:])],
+                                     np.empty(0, dtype=np.int64))
+
+            # Consultas cercanas a películas del catálogo, como un prompt parecido a una sinopsis
+            picks = rng.choice(rows, options["queries"], replace=False)
+            queries = np.asarray(index.matrix[np.sort(picks)]) + 0.05 * rng.standard_normal((len(picks), dim), dtype=np.float32)
+            queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+            engine = ScoringEngine(index)
+            try:
+                exact, exact_times = [], []
+                for query in queries:
+                    start = time.perf_counter()
+                    exact.append({movie_id for movie_id, _ in engine.top_k(query, k=10)})
+                    exact_times.append(time.perf_counter() - start)
+                baseline = statistics.median(exact_times) * 1000
+                self.stdout.write(f"  {'probes':>8} {'candidates':>11} {'p50 ms':>8} {'speedup':>8} {'recall@10':>10}")
+                self.stdout.write(f"  {'exact':>8} {rows:>11} {baseline:>8.2f} {1:>7.2f}x {1:>10.3f}")
+                for probes in options["probes"]:
+                    times, recall, candidates = [], [], []
+                    for query, expected in zip(queries, exact):
+                        start = time.perf_counter()
+                        ids = cluster_set.candidate_ids(query, probes)
+                        found = {movie_id for movie_id, _ in engine.top_k(query, k=10, candidate_ids=ids)}
+                        times.append(time.perf_counter() - start)
+                        recall.append(len(found & expected) / len(expected))
+                        candidates.append(len(ids))
+                    p50 = statistics.median(times) * 1000
+                    self.stdout.write(f"  {probes:>8} {round(statistics.mean(candidates)):>11} {p50:>8.2f} "
+                                      f"{baseline / p50:>7.2f}x {statistics.mean(recall):>10.3f}")
+            finally:
+                engine.close()
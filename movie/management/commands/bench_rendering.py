@@ -0,0 +1,74 @@
+import datetime
+import statistics
+import time
+
+from django.template import engines
+from django.utils import timezone
+
+from movie.management.base import MovieCommand
+from movie.models import Movie
+
+# El bucle de home.html antes, con {% cache %} por tarjeta y con {% cached_cards %} (un get_many)
+BEFORE = '{% for movie in movies %}{% include "movie_card.html" %}{% endfor %}'
+CACHE_TAG = ('{% load cache %}{% for movie in movies %}'
+             '{% cache 60 movie_card movie.pk movie.updated_at %}{% include "movie_card.html" %}{% endcache %}'
+             '{% endfor %}')
+CACHED_CARDS = '{% load cards %}{% cached_cards movies "movie_card.html" "movie" 60 %}'
+
+
+class Command(MovieCommand):
+    help = "Benchmark rendering the movie card grid with and without per-card fragment caching."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--cards", type=int, nargs="+", default=[1_000, 10_000],
+                            help="Grid sizes (default: 1000 10000)")
+        parser.add_argument("--repeat", type=int, default=5, help="Renders per measurement (default: 5)")
+        parser.add_argument("--changed", type=float, default=0.01,
+                            help="Fraction of cards edited between renders (default: 0.01)")
+
+    def handle(self, *args, **options):
+        engine = engines["django"]
+        before, cache_tag, cached_cards = (engine.from_string(source) for source in (BEFORE, CACHE_TAG, CACHED_CARDS))
+        repeat = options["repeat"]
+        self.stdout.write(f"{'cards':>7} {'before ms':>10} | {'{% cache %} cold':>16} {'warm':>7} | "
+                          f"{'cached_cards cold':>17} {'warm':>7} {'speedup':>8} {'edited':>7}")
+        for cards in options["cards"]:
+            # updated_at recién generado: ninguna clave está en caché todavía (ni choca con las reales)
+            movies = self.movies(cards)
+            before_ms = self.measure(before, movies, repeat)
+            tag_cold, tag_warm = self.measure(cache_tag, movies, 1), self.measure(cache_tag, movies, repeat)
+
+            movies = self.movies(cards)
+            cold_ms, warm_ms = self.measure(cached_cards, movies, 1), self.measure(cached_cards, movies, repeat)
+            if options["changed"]:
+                now = timezone.now()
+                for movie in movies[::max(1, round(1 / options["changed"]))]:
+                    movie.updated_at = now
+            edited_ms = self.measure(cached_cards, movies, 1)
+            self.stdout.write(f"{cards:>7} {before_ms:>10.1f} | {tag_cold:>16.1f} {tag_warm:>7.1f} | "
+                              f"{cold_ms:>17.1f} {warm_ms:>7.1f} {before_ms / warm_ms:>7.1f}x {edited_ms:>7.1f}")
+
+    def movies(self, count):
+        """Películas en memoria con textos del tamaño real (sin tocar la BD)."""
+        updated_at = timezone.now() - datetime.timedelta(days=1)
+        return [
+            Movie(
+                pk=pk,
+                title=f"Movie {pk}",
+                description="A short film about " + "cinema and memory, " * 20,
+                image=f"movie/images/m_Movie {pk}.png",
+                url=f"https://example.com/movie/{pk}",
+                genre="Short, Drama, Comedy",
+                year=1900 + pk % 120,
+                updated_at=updated_at,
+            )
+            for pk in range(1, count + 1)
+        ]
+
+    def measure(self, template, movies, repeat):
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            template.render({"movies": movies})
+            times.append(time.perf_counter() - start)
+        return statistics.median(times) * 1000
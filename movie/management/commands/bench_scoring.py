@@ -0,0 +1,60 @@
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from movie.management.base import MovieCommand
+from movie.scoring import EmbeddingIndex, ScoringEngine
+
+
+class Command(MovieCommand):
+    help = "Scaling benchmark of the sharded scoring engine on synthetic embeddings."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=200_000, help="Synthetic catalog size (default: 200000)")
+        parser.add_argument("--dim", type=int, default=1536, help="Embedding dimension (default: 1536)")
+        parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8], help="Worker counts (default: 1 2 4 8)")
+        parser.add_argument("--executor", choices=("thread", "process"), default="thread")
+        parser.add_argument("--queries", type=int, default=32, help="Prompts per batch query (default: 32)")
+        parser.add_argument("--repeat", type=int, default=10, help="Single-query repetitions (default: 10)")
+        parser.add_argument("--k", type=int, default=10, help="Results per query (default: 10)")
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(0)
+        rows, dim = options["rows"], options["dim"]
+        with tempfile.TemporaryDirectory(prefix="moviereviews-scoring-") as directory:
+            self.stdout.write(f"Building synthetic index: {rows} x {dim} float32 ({rows * dim * 4 / 2**20:.0f} MB)...")
+            matrix = np.lib.format.open_memmap(f"{directory}/raw.npy", mode="w+", dtype=np.float32, shape=(rows, dim))
+            for start in range(0, rows, 8192):
+                stop = min(rows, start + 8192)
+                matrix[start:stop] = rng.standard_normal((stop - start, dim), dtype=np.float32)
+            index = EmbeddingIndex.from_array(np.arange(1, rows + 1), matrix, directory)
+            del matrix
+
+            queries = rng.standard_normal((options["queries"], dim), dtype=np.float32)
+            self.stdout.write(f"{'workers':>8} {'single p50 ms':>14} {'speedup':>8} {'batch q/s':>10} {'speedup':>8}")
+            baseline_single = baseline_batch = None
+            for workers in options["workers"]:
+                engine = ScoringEngine(index, workers=workers, executor=options["executor"])
+                try:
+                    engine.top_k(queries[0], k=options["k"])  # calentar pool y page cache
+                    single = []
+                    for i in range(options["repeat"]):
+                        start = time.perf_counter()
+                        engine.top_k(queries[i % len(queries)], k=options["k"])
+                        single.append(time.perf_counter() - start)
+                    start = time.perf_counter()
+                    engine.top_k_batch(queries, k=options["k"])
+                    batch_qps = len(queries) / (time.perf_counter() - start)
+                finally:
+                    engine.close(delete_files=False)
+
+                p50 = statistics.median(single) * 1000
+                baseline_single = baseline_single or p50
+                baseline_batch = baseline_batch or batch_qps
+                self.stdout.write(
+                    f"{workers:>8} {p50:>14.2f} {baseline_single / p50:>7.2f}x "
+                    f"{batch_qps:>10.1f} {batch_qps / baseline_batch:>7.2f}x"
+                )
+            index.delete_files()
@@ -0,0 +1,145 @@
+import os
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections, transaction
+
+from movie.management.base import MovieCommand
+from movie.models import Movie
+
+
+class Command(MovieCommand):
+    help = (
+        "Benchmark readers running while a writer bulk_updates embeddings, "
+        "comparing SQLite defaults against the tuned SQLITE_PRAGMAS. Works on temporary copies of the DB."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--readers", type=int, default=4, help="Concurrent reader threads (default: 4)")
+        parser.add_argument("--seconds", type=float, default=5.0, help="Duration of each run (default: 5)")
+        parser.add_argument("--rows", type=int, default=2000, help="Rows in the benchmark DB (default: 2000)")
+        parser.add_argument("--batch-size", type=int, default=200, help="bulk_update batch size (default: 200)")
+
+    def handle(self, *args, **options):
+        base = dict(connections['default'].settings_dict)
+        if base['ENGINE'] != 'django.db.backends.sqlite3':
+            self.stderr.write("This benchmark only applies to SQLite.")
+            return
+
+        tmpdir = tempfile.mkdtemp(prefix="moviereviews-bench-")
+        try:
+            template = os.path.join(tmpdir, "template.sqlite3")
+            self.stdout.write(f"Preparing benchmark DB with {options['rows']} rows...")
+            self.prepare_template(base, template, options['rows'])
+
+            modes = [
+                ("defaults", {'journal_mode': 'DELETE'}, {'timeout': 5}),
+                ("tuned", settings.SQLITE_PRAGMAS, base['OPTIONS']),
+            ]
+            for label, pragmas, db_options in modes:
+                path = os.path.join(tmpdir, f"{label}.sqlite3")
+                shutil.copyfile(template, path)
+                alias = f"bench_{label}"
+                connections.settings[alias] = dict(base, NAME=path, PRAGMAS=pragmas, OPTIONS=dict(db_options), CONN_MAX_AGE=None)
+                try:
+                    result = self.run_mode(alias, options)
+                finally:
+                    connections[alias].close()
+                    del connections.settings[alias]
+                self.report(label, result)
+        finally:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+    def prepare_template(self, base, path, rows):
+        alias = "bench_template"
+        # backup() incluye lo que aún esté en el -wal del archivo original
+        source_db, target_db = sqlite3.connect(base['NAME']), sqlite3.connect(path)
+        with target_db:
+            source_db.backup(target_db)
+        source_db.close()
+        target_db.close()
+        connections.settings[alias] = dict(base, NAME=path, PRAGMAS={'journal_mode': 'DELETE'}, CONN_MAX_AGE=None)
+        try:
+            source = list(Movie.objects.using(alias).values('title', 'description', 'genre', 'year', 'emb'))
+            missing = rows - len(source)
+            if source and missing > 0:
+                copies = [Movie(**dict(source[i % len(source)], title=f"{source[i % len(source)]['title']} #{i}"))
+                          for i in range(missing)]
+                Movie.objects.using(alias).bulk_create(copies, batch_size=500)
+        finally:
+            connections[alias].close()
+            del connections.settings[alias]
+
+    def run_mode(self, alias, options):
+        stop = threading.Event()
+        latencies = []
+        errors = []
+        writes = []
+        lock = threading.Lock()
+
+        def reader():
+            local = []
+            try:
+                while not stop.is_set():
+                    start = time.perf_counter()
+                    try:
+                        list(Movie.objects.using(alias).values_list('id', 'emb')[:500])
+                    except Exception as e:
+                        with lock:
+                            errors.append(str(e))
+                        continue
+                    local.append(time.perf_counter() - start)
+            finally:
+                connections[alias].close()
+                with lock:
+                    latencies.extend(local)
+
+        def writer():
+            movies = list(Movie.objects.using(alias).only('id', 'emb'))
+            try:
+                while not stop.is_set():
+                    start = time.perf_counter()
+                    try:
+                        with transaction.atomic(using=alias):
+                            Movie.objects.using(alias).bulk_update(movies, ['emb'], batch_size=options['batch_size'])
+                    except Exception as e:
+                        with lock:
+                            errors.append(str(e))
+                        continue
+                    writes.append(time.perf_counter() - start)
+            finally:
+                connections[alias].close()
+
+        threads = [threading.Thread(target=writer)]
+        threads += [threading.Thread(target=reader) for _ in range(options['readers'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        time.sleep(options['seconds'])
+        stop.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        return {'latencies': latencies, 'errors': errors, 'writes': writes, 'elapsed': elapsed}
+
+    def report(self, label, result):
+        latencies = sorted(result['latencies'])
+        if latencies:
+            p50 = statistics.median(latencies) * 1000
+            p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000
+            worst = latencies[-1] * 1000
+        else:
+            p50 = p95 = worst = float('nan')
+        self.stdout.write(self.style.SUCCESS(f"[{label}]"))
+        self.stdout.write(
+            f"   reads: {len(latencies)} ({len(latencies) / result['elapsed']:.1f}/s)  "
+            f"p50 {p50:.1f} ms  p95 {p95:.1f} ms  max {worst:.1f} ms"
+        )
+        self.stdout.write(f"   bulk_update passes: {len(result['writes'])}  errors: {len(result['errors'])}")
+        if result['errors']:
+            self.stdout.write(f"   first error: {result['errors'][0]}")
@@ -0,0 +1,78 @@
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+
+from movie.management.base import MovieCommand
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|\s*(\S+)")
+PROJECT_PACKAGES = ("movie", "moviereviews", "news")
+
+
+class Command(MovieCommand):
+    help = (
+        "Measure worker startup: wall time, peak RSS and `python -X importtime` "
+        "cost of `manage.py <command>` run in fresh interpreters."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to start (default: 5)")
+        parser.add_argument("--top", type=int, default=15, help="Slowest top-level imports to list (default: 15)")
+        parser.add_argument("target", nargs="*", default=["check"], help="manage.py arguments to run (default: check)")
+
+    def handle(self, *args, **options):
+        manage_py = os.path.join(settings.BASE_DIR, "manage.py")
+        argv = [sys.executable, manage_py, *options["target"]]
+
+        walls, rss = [], []
+        for _ in range(options["runs"]):
+            wall, max_rss_kb, _ = self.run(argv)
+            walls.append(wall)
+            rss.append(max_rss_kb)
+
+        _, _, stderr = self.run([sys.executable, "-X", "importtime", *argv[1:]])
+        imports = self.parse_importtime(stderr)
+        total_us = sum(self_us for self_us, _, _ in imports)
+
+        self.stdout.write(self.style.SUCCESS(f"🚀 {' '.join(options['target'])} x{options['runs']}"))
+        self.stdout.write(f"   wall time   median {statistics.median(walls) * 1000:8.1f} ms   min {min(walls) * 1000:8.1f} ms")
+        self.stdout.write(f"   peak RSS    median {statistics.median(rss) / 1024:8.1f} MB")
+        self.stdout.write(f"   imports     {len(imports)} modules, {total_us / 1000:.1f} ms total (importtime)")
+
+        packages = [(cumulative, name) for _, cumulative, name in imports if "." not in name]
+        self.stdout.write("   slowest packages (cumulative):")
+        for cumulative, name in sorted(packages, reverse=True)[:options["top"]]:
+            self.stdout.write(f"     {cumulative / 1000:8.1f} ms  {name}")
+
+        project = [(cumulative, name) for _, cumulative, name in imports
+                   if name.split(".")[0] in PROJECT_PACKAGES]
+        self.stdout.write("   project modules (cumulative):")
+        for cumulative, name in sorted(project, reverse=True)[:options["top"]]:
+            self.stdout.write(f"     {cumulative / 1000:8.1f} ms  {name}")
+
+    def run(self, argv):
+        """Ejecuta argv y devuelve (segundos, RSS máximo en KB, stderr)."""
+        start = time.perf_counter()
+        proc = subprocess.Popen(argv, cwd=settings.BASE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        stderr = proc.stderr.read().decode("utf-8", errors="replace")
+        _, status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        wall = time.perf_counter() - start
+        if proc.returncode != 0:
+            self.stderr.write(f"❌ {' '.join(argv)} exited with {proc.returncode}")
+        # ru_maxrss está en KB en Linux y en bytes en macOS
+        max_rss_kb = usage.ru_maxrss / 1024 if sys.platform == "darwin" else usage.ru_maxrss
+        return wall, max_rss_kb, stderr
+
+    def parse_importtime(self, stderr):
+        """Líneas de -X importtime -> [(self_us, cumulative_us, módulo)]."""
+        imports = []
+        for line in stderr.splitlines():
+            match = IMPORTTIME_LINE.match(line)
+            if match:
+                imports.append((int(match.group(1)), int(match.group(2)), match.group(3)))
+        return imports
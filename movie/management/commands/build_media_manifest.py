@@ -0,0 +1,15 @@
+from django.conf import settings
+
+from movie import media
+from movie.management.base import MovieCommand
+
+
+class Command(MovieCommand):
+    help = "Hash every file under MEDIA_ROOT into the manifest used to serve media with ETags and long-lived caching"
+
+    def handle(self, *args, **options):
+        manifest = media.build_manifest()
+        media.write_manifest(manifest)
+        total_mb = sum(entry["size"] for entry in manifest.values()) / 2**20
+        self.stdout.write(self.style.SUCCESS(
+            f"🗂️ Manifest with {len(manifest)} files ({total_mb:.1f} MB) written to {settings.MEDIA_MANIFEST}"))
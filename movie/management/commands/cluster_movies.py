@@ -0,0 +1,62 @@
+import glob
+import math
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import CommandError
+
+from movie import clustering, scoring
+from movie.management.base import MovieCommand
+from movie.models import IndexGeneration
+
+
+class Command(MovieCommand):
+    help = "Group the catalog into themes with mini-batch k-means over the embeddings (browse page and /recommend/ prefilter)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--k", type=int, help="Number of groups (default: sqrt(movies / 2), between 2 and 512)")
+        parser.add_argument("--batch-size", type=int, default=1024, help="Rows per mini-batch (default: 1024)")
+        parser.add_argument("--max-iter", type=int, default=300, help="Maximum mini-batch steps (default: 300)")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--checkpoint-every", type=int, default=20, help="Save progress every N steps (default: 20)")
+        parser.add_argument("--resume", action="store_true",
+                            help="Continue from the last checkpoint of this embeddings generation")
+
+    def handle(self, *args, **options):
+        generation = IndexGeneration.current()
+        index = scoring.get_engine(generation).index
+        if len(index) == 0:
+            raise CommandError("No embeddings to cluster: run movie_embeddings first.")
+        k = options["k"] or min(512, max(2, round(math.sqrt(len(index) / 2))))
+        if not 1 <= k <= len(index):
+            raise CommandError(f"--k must be between 1 and {len(index)}")
+
+        # Un checkpoint por generación: si cambian los embeddings se empieza de cero
+        checkpoint = os.path.join(settings.SCORING_INDEX_DIR, f"clusters-gen{generation}.npz")
+        model = clustering.MiniBatchKMeans(k, batch_size=options["batch_size"], max_iter=options["max_iter"],
+                                           seed=options["seed"])
+        if options["resume"] and model.restore(checkpoint):
+            self.stdout.write(f"⏯️ Resuming from step {model.iteration} ({checkpoint})")
+        self.stdout.write(f"🧮 Clustering {len(index)} movies x {index.dim} into {model.k} groups")
+
+        start = time.perf_counter()
+
+        def progress(iteration, objective):
+            if iteration % 50 == 0:
+                self.stdout.write(f"  step {iteration}: average similarity {objective:.4f}")
+
+        model.fit(index.matrix, checkpoint=checkpoint, checkpoint_every=options["checkpoint_every"], callback=progress)
+        fitted = time.perf_counter()
+        labels, similarities = model.predict(index.matrix)
+        clusters = clustering.store_clusters(model, index.ids, labels, similarities, generation)
+        for path in glob.glob(os.path.join(settings.SCORING_INDEX_DIR, "clusters-gen*.npz")):
+            os.remove(path)  # este y los de generaciones anteriores
+
+        self.stdout.write(
+            f"⏱️ fit {fitted - start:.2f}s ({model.iteration} steps), "
+            f"assign + save {time.perf_counter() - fitted:.2f}s"
+        )
+        for cluster in sorted(clusters, key=lambda cluster: -cluster.size)[:10]:
+            self.stdout.write(f"  {cluster.size:>6}  {cluster.label or '-'}")
+        self.stdout.write(self.style.SUCCESS(f"🎯 Stored {len(clusters)} groups (average similarity {similarities.mean():.3f})"))
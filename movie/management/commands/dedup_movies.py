@@ -0,0 +1,84 @@
+import csv
+
+from django.db import transaction
+
+from movie import dedup
+from movie.management.base import MovieCommand
+from movie.models import Movie
+
+DEFAULT_IMAGE = 'movie/images/default.jpg'
+
+
+class Command(MovieCommand):
+    help = "Report (and optionally merge) near-duplicate movies found with LSH on embeddings and titles"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--emb-threshold", type=float, default=dedup.EMB_THRESHOLD,
+                            help=f"Minimum embedding cosine (default: {dedup.EMB_THRESHOLD})")
+        parser.add_argument("--title-threshold", type=float, default=dedup.TITLE_THRESHOLD,
+                            help=f"Minimum title 3-gram Jaccard (default: {dedup.TITLE_THRESHOLD})")
+        parser.add_argument("--no-embeddings", action="store_true", help="Only compare titles")
+        parser.add_argument("--no-titles", action="store_true", help="Only compare embeddings")
+        parser.add_argument("--csv", help="Also write the pairs to this CSV file")
+        parser.add_argument("--merge", action="store_true",
+                            help="Merge each group into its oldest movie and delete the rest")
+        parser.add_argument("--ignore-year", action="store_true",
+                            help="Also merge groups whose years differ (remakes are skipped by default)")
+
+    def handle(self, *args, **options):
+        pairs = dedup.find_duplicates(
+            emb_threshold=options["emb_threshold"],
+            title_threshold=options["title_threshold"],
+            use_embeddings=not options["no_embeddings"],
+            use_titles=not options["no_titles"],
+        )
+        ids = {movie_id for pair in pairs for movie_id in (pair.movie_id, pair.other_id)}
+        movies = Movie.objects.in_bulk(ids)
+
+        for pair in pairs:
+            movie, other = movies[pair.movie_id], movies[pair.other_id]
+            cosine = "-" if pair.cosine is None else f"{pair.cosine:.3f}"
+            self.stdout.write(
+                f"🔁 {movie.pk} '{movie.title}' ({movie.year}) ~ {other.pk} '{other.title}' ({other.year})"
+                f"  cosine={cosine} title={pair.title_similarity:.2f}"
+            )
+        self.stdout.write(f"Found {len(pairs)} candidate duplicate pairs")
+
+        if options["csv"]:
+            with open(options["csv"], "w", newline="", encoding="utf-8") as file:
+                writer = csv.writer(file)
+                writer.writerow(["movie_id", "title", "year", "other_id", "other_title", "other_year", "cosine", "title_similarity"])
+                for pair in pairs:
+                    movie, other = movies[pair.movie_id], movies[pair.other_id]
+                    writer.writerow([movie.pk, movie.title, movie.year, other.pk, other.title, other.year,
+                                     pair.cosine, pair.title_similarity])
+            self.stdout.write(f"📄 Pairs written to {options['csv']}")
+
+        if options["merge"]:
+            merged = 0
+            for group in dedup.group_duplicates(pairs):
+                group_movies = [movies[movie_id] for movie_id in group]
+                years = {movie.year for movie in group_movies if movie.year}
+                if len(years) > 1 and not options["ignore_year"]:
+                    self.stdout.write(self.style.WARNING(f"Skipping {group}: different years {sorted(years)} (remake?)"))
+                    continue
+                merged += self.merge(group_movies[0], group_movies[1:])
+            self.stdout.write(self.style.SUCCESS(f"🎯 Merged and deleted {merged} duplicate movies"))
+
+    @transaction.atomic
+    def merge(self, keeper, duplicates):
+        """Completa los campos vacíos del más antiguo con los duplicados y borra estos."""
+        update_fields = []
+        for duplicate in duplicates:
+            for field in ("url", "genre", "year", "description"):
+                if not getattr(keeper, field) and getattr(duplicate, field):
+                    setattr(keeper, field, getattr(duplicate, field))
+                    update_fields.append(field)
+            if keeper.image.name == DEFAULT_IMAGE and duplicate.image.name != DEFAULT_IMAGE:
+                keeper.image = duplicate.image
+                update_fields.append("image")
+        if update_fields:
+            keeper.save(update_fields=sorted(set(update_fields)))
+        Movie.objects.filter(pk__in=[movie.pk for movie in duplicates]).delete()
+        self.stdout.write(f"✅ Kept {keeper.pk} '{keeper.title}', deleted {[movie.pk for movie in duplicates]}")
+        return len(duplicates)
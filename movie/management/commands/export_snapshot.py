@@ -0,0 +1,18 @@
+import os
+
+from movie.management.base import MovieCommand
+from movie.snapshot import export_snapshot
+
+
+class Command(MovieCommand):
+    help = "Export the movie catalog (metadata + embeddings) to a columnar .npz snapshot"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", nargs="?", default="movies_snapshot.npz", help="Output file (default: movies_snapshot.npz)")
+        parser.add_argument("--chunk-size", type=int, default=2000, help="Rows read per query (default: 2000)")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        total = export_snapshot(path, chunk_size=options["chunk_size"])
+        size_mb = os.path.getsize(path) / 2**20
+        self.stdout.write(self.style.SUCCESS(f"📦 Exported {total} movies to {path} ({size_mb:.1f} MB)"))
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import CommandError
+
+from movie.management.base import MovieCommand
+from movie.snapshot import import_snapshot
+
+
+class Command(MovieCommand):
+    help = "Seed the movie catalog from a snapshot made with export_snapshot (no API calls)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", nargs="?", default="movies_snapshot.npz", help="Snapshot file (default: movies_snapshot.npz)")
+        parser.add_argument("--chunk-size", type=int, default=2000, help="Rows per bulk_create (default: 2000)")
+        parser.add_argument("--replace", action="store_true", help="Delete the current catalog before importing")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            total = import_snapshot(options["path"], chunk_size=options["chunk_size"], replace=options["replace"])
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(f"Could not import {options['path']}: {e}")
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(f"✅ Imported {total} movies in {elapsed:.1f}s"))
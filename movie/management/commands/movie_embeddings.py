@@ -1,35 +1,23 @@
-import os
-import numpy as np
-from django.core.management.base import BaseCommand
+from movie.management.base import MovieCommand
 from movie.models import Movie
-from openai import OpenAI
-from openai import OpenAI
-from dotenv import load_dotenv
+from movie import ai, instrumentation
 
-class Command(BaseCommand):
+class Command(MovieCommand):
     help = "Generate and store embeddings for all movies in the database"
 
     def handle(self, *args, **kwargs):
-        load_dotenv()
-        client = OpenAI(api_key=os.environ.get('openai_apikey'))
-
         movies = Movie.objects.all()
         self.stdout.write(f"Found {movies.count()} movies in the database")
 
-        def get_embedding(text):
-            response = client.embeddings.create(
-                input=[text],
-                model="text-embedding-3-small"
-            )
-            return np.array(response.data[0].embedding, dtype=np.float32)
-
         # ✅ Iterate through movies and generate embeddings
         for movie in movies:
             try:
-                emb = get_embedding(movie.description)
+                with instrumentation.span('embedding'):
+                    emb = ai.get_embedding(movie.description)
                 # ✅ Store embedding as binary in the database
                 movie.emb = emb.tobytes()
-                movie.save()
+                with instrumentation.span('db.save'):
+                    movie.save()
                 self.stdout.write(self.style.SUCCESS(f"✅ Embedding stored for: {movie.title}"))
             except Exception as e:
                 self.stderr.write(f"❌ Failed to generate embedding for {movie.title}: {e}")
@@ -1,34 +1,24 @@
-import os
 import numpy as np
-from django.core.management.base import BaseCommand
+from movie.management.base import MovieCommand
 from movie.models import Movie
-from openai import OpenAI
-from dotenv import load_dotenv
+from movie import instrumentation
+from movie.ai import get_embedding
 
-class Command(BaseCommand):
+class Command(MovieCommand):
     help = "Compare two movies and optionally a prompt using OpenAI embeddings"
 
     def handle(self, *args, **kwargs):
-        load_dotenv()
-        client = OpenAI(api_key=os.environ.get('openai_apikey'))
-
         # ✅ Change these titles for any movies you want to compare
         movie1 = Movie.objects.get(title="Carmencita")
         movie2 = Movie.objects.get(title="Pauvre Pierrot")
 
-        def get_embedding(text):
-            response = client.embeddings.create(
-                input=[text],
-                model="text-embedding-3-small"
-            )
-            return np.array(response.data[0].embedding, dtype=np.float32)
-
         def cosine_similarity(a, b):
             return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
 
         # ✅ Generate embeddings of both movies
-        emb1 = get_embedding(movie1.description)
-        emb2 = get_embedding(movie2.description)
+        with instrumentation.span('embedding'):
+            emb1 = get_embedding(movie1.description)
+            emb2 = get_embedding(movie2.description)
 
         # ✅ Compute similarity between movies
         similarity = cosine_similarity(emb1, emb2)
@@ -36,7 +26,8 @@ class Command(BaseCommand):
 
         # ✅ Optional: Compare against a prompt
         prompt = "Carmencita"
-        prompt_emb = get_embedding(prompt)
+        with instrumentation.span('embedding'):
+            prompt_emb = get_embedding(prompt)
 
         sim_prompt_movie1 = cosine_similarity(prompt_emb, emb1)
         sim_prompt_movie2 = cosine_similarity(prompt_emb, emb2)
@@ -0,0 +1,47 @@
+import os
+import socket
+import time
+
+from movie.management.base import MovieCommand
+from movie.models import Job
+from movie import jobs
+
+
+class Command(MovieCommand):
+    help = "Process the background job queue (embeddings, descriptions, posters)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Exit when no pending jobs are left")
+        parser.add_argument("--batch-size", type=int, default=50, help="Jobs of the same kind per batch (default: 50)")
+        parser.add_argument("--sleep", type=float, default=5.0, help="Seconds to wait when the queue is empty (default: 5)")
+        parser.add_argument("--kind", action="append", choices=[kind for kind, _ in Job.KIND_CHOICES],
+                            help="Only process these job kinds (repeatable)")
+
+    def handle(self, *args, **options):
+        worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.stdout.write(self.style.NOTICE(f"Worker {worker_id} started"))
+
+        requeued = jobs.requeue_stale()
+        if requeued:
+            self.stdout.write(self.style.WARNING(f"Requeued {requeued} stale running jobs"))
+
+        total_done = total_failed = 0
+        try:
+            while True:
+                batch = jobs.claim_batch(worker_id, options["batch_size"], options["kind"])
+                if not batch:
+                    if options["once"]:
+                        break
+                    jobs.requeue_stale()
+                    time.sleep(options["sleep"])
+                    continue
+
+                done, failed = jobs.run_batch(batch)
+                total_done += done
+                total_failed += failed
+                message = f"{batch[0].kind}: {done} done, {failed} failed"
+                self.stdout.write(self.style.SUCCESS(message) if not failed else self.style.WARNING(message))
+        except KeyboardInterrupt:
+            self.stdout.write("Interrupted")
+
+        self.stdout.write(self.style.SUCCESS(f"🎯 Finished. Done: {total_done}, Failed: {total_failed}"))
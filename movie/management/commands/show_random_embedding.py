@@ -1,8 +1,9 @@
 import numpy as np
-from django.core.management.base import BaseCommand
+from movie.management.base import MovieCommand
 from movie.models import Movie
+from movie import instrumentation
 
-class Command(BaseCommand):
+class Command(MovieCommand):
     """
     Comando de Django para seleccionar una película al azar y mostrar sus embeddings.
     """
@@ -11,7 +12,8 @@ class Command(BaseCommand):
     def handle(self, *args, **kwargs):
         # Usamos order_by('?') para obtener un objeto aleatorio de la base de datos.
         # .first() asegura que solo obtenemos uno.
-        random_movie = Movie.objects.order_by('?').first()
+        with instrumentation.span('db'):
+            random_movie = Movie.objects.order_by('?').first()
 
         if not random_movie:
             self.stdout.write(self.style.ERROR('❌ No se encontraron películas en la base de datos.'))
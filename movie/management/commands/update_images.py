@@ -1,17 +1,12 @@
 import os
-import requests
-from openai import OpenAI
-from django.core.management.base import BaseCommand
+from movie.management.base import MovieCommand
 from movie.models import Movie
-from dotenv import load_dotenv
+from movie import ai, media
 
-class Command(BaseCommand):
+class Command(MovieCommand):
     help = "Generate images with OpenAI and update movie image field"
 
     def handle(self, *args, **kwargs):
-        load_dotenv()
-        client = OpenAI(api_key=os.environ.get('openai_apikey'))
-        
         # ✅ Folder to save images
         images_folder = 'media/movie/images/'
         os.makedirs(images_folder, exist_ok=True)
@@ -23,11 +18,12 @@ class Command(BaseCommand):
         for movie in movies:
             try:
                 # ✅ Call the helper function
-                image_relative_path = self.generate_and_download_image(client, movie.title, images_folder)
+                image_relative_path = ai.generate_poster(movie.title, images_folder)
 
                 # ✅ Update database
                 movie.image = image_relative_path
                 movie.save()
+                media.update_manifest([image_relative_path])
                 self.stdout.write(self.style.SUCCESS(f"Saved and updated image for: {movie.title}"))
 
             except Exception as e:
@@ -37,34 +33,3 @@ class Command(BaseCommand):
             break
 
         self.stdout.write(self.style.SUCCESS("Process finished (only first movie updated)."))
-
-    def generate_and_download_image(self, client, movie_title, save_folder):
-        """
-        Generates an image using OpenAI's DALL·E model and downloads it.
-        Returns the relative image path or raises an exception.
-        """
-        prompt = f"Movie poster of {movie_title}"
-
-        # ✅ Generate image with OpenAI
-        # ✅ Código corregido usando DALL-E 3
-        response = client.images.generate(
-            model="dall-e-3",
-            prompt=prompt,
-            size="1024x1024",     # DALL-E 3 requiere tamaños de 1024x1024, 1792x1024, o 1024x1792
-            quality="standard",   # Ahora este parámetro es válido
-            n=1,
-        )
-        image_url = response.data[0].url
-
-        # ✅ Prepare the filename and full save path
-        image_filename = f"m_{movie_title}.png"
-        image_path_full = os.path.join(save_folder, image_filename)
-
-        # ✅ Download the image
-        image_response = requests.get(image_url)
-        image_response.raise_for_status()
-        with open(image_path_full, 'wb') as f:
-            f.write(image_response.content)
-
-        # ✅ Return relative path to be saved in the DB
-        return os.path.join('movie/images', image_filename)
\ No newline at end of file
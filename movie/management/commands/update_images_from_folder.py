@@ -1,10 +1,11 @@
 import os
 import glob
-from django.core.management.base import BaseCommand
+from movie.management.base import MovieCommand
 from django.conf import settings
 from movie.models import Movie
+from movie import instrumentation
 
-class Command(BaseCommand):
+class Command(MovieCommand):
     help = "Assign images from media/movie/images/ to movies in DB (names like m_<TITLE>.png)."
 
     def add_arguments(self, parser):
@@ -57,7 +58,8 @@ class Command(BaseCommand):
             # 3) Intento por glob insensible a mayúsculas (baja a minúsculas)
             if not any(os.path.exists(p) for p in candidates):
                 pattern = os.path.join(images_folder, f"m_*")
-                all_files = glob.glob(pattern)
+                with instrumentation.span('fs.glob'):
+                    all_files = glob.glob(pattern)
                 # match básico: igualando título sin mayúsculas/minúsculas y normalizando separadores
                 normalized_title = safe_title.lower().replace(" ", "_")
                 def norm(s):
@@ -92,7 +94,8 @@ class Command(BaseCommand):
                     relative_path = os.path.join("movie", "images", os.path.basename(chosen))
 
             movie.image = relative_path
-            movie.save(update_fields=["image"])
+            with instrumentation.span('db.save'):
+                movie.save(update_fields=["image"])
             updated += 1
             self.stdout.write(self.style.SUCCESS(f"Updated image: {title} -> {relative_path}"))
 
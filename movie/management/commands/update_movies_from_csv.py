@@ -1,9 +1,10 @@
 import os
 import csv
-from django.core.management.base import BaseCommand
+from movie.management.base import MovieCommand
 from movie.models import Movie
+from movie import dedup, instrumentation
 
-class Command(BaseCommand):
+class Command(MovieCommand):
     help = "Update movie descriptions in the database from a CSV file"
 
     def handle(self, *args, **kwargs):
@@ -18,6 +19,10 @@ class Command(BaseCommand):
         updated_count = 0
         not_found_count = 0
 
+        # Si el título no coincide exacto, se busca un casi duplicado (otra grafía)
+        with instrumentation.span('dedup.index'):
+            titles = dedup.TitleIndex.from_queryset(Movie.objects.all())
+
         # 📖 Abrimos el CSV y leemos cada fila
         with open(csv_file, mode='r', encoding='utf-8') as file:
             reader = csv.DictReader(file)
@@ -31,11 +36,24 @@ class Command(BaseCommand):
 
                 try:
                     # ❗ Código completado para buscar la película por título
-                    movie = Movie.objects.get(title=title)
+                    with instrumentation.span('db.lookup'):
+                        movie = Movie.objects.filter(title=title).first()
+                        if movie is None:
+                            # El CSV no trae año: un título parecido puede ser una secuela
+                            # ("Rocky II" / "Rocky III"), así que solo se informa, no se actualiza
+                            similar = titles.similar(title)
+                            if similar:
+                                match = Movie.objects.filter(pk=similar[0][0]).values_list('title', flat=True).first()
+                                self.stderr.write(self.style.WARNING(
+                                    f"Not updated: '{title}' is not in the DB; closest title is "
+                                    f"{similar[0][0]} '{match}' (similarity {similar[0][1]:.2f}). "
+                                    f"Fix the CSV title to update it."))
+                            raise Movie.DoesNotExist
 
                     # ❗ Código completado para actualizar la descripción de la película
                     movie.description = new_description
-                    movie.save()
+                    with instrumentation.span('db.save'):
+                        movie.save()
                     updated_count += 1
 
                     self.stdout.write(self.style.SUCCESS(f"Updated: {title}"))
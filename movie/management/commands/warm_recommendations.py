@@ -0,0 +1,76 @@
+import json
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.management.base import CommandError
+
+from movie import ai, instrumentation, result_cache, scoring
+from movie.management.base import MovieCommand
+from movie.models import IndexGeneration, Movie
+
+
+class Command(MovieCommand):
+    help = "Precompute /recommend/ results for the most frequent prompts in the prompt log."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--log", default=settings.RECOMMENDATION_PROMPT_LOG,
+                            help="Prompt log: JSON lines from RECOMMENDATION_PROMPT_LOG or one prompt per line")
+        parser.add_argument("--top", type=int, default=500, help="How many distinct prompts to warm (default: 500)")
+        parser.add_argument("--batch-size", type=int, default=100, help="Prompts per embeddings API call (default: 100)")
+        parser.add_argument("--force", action="store_true", help="Recompute prompts that are already cached")
+
+    def handle(self, *args, **options):
+        if not options["log"]:
+            raise CommandError("No prompt log: pass --log or set RECOMMENDATION_PROMPT_LOG.")
+        if settings.CACHES[result_cache.CACHE_ALIAS]["BACKEND"].endswith("LocMemCache"):
+            self.stdout.write("⚠️ The recommendations cache is LocMemCache (per process): "
+                              "web workers won't see these entries.")
+
+        counts = self._read_log(options["log"])
+        generation = IndexGeneration.current()
+        pending = defaultdict(list)  # genre -> prompts
+        for (prompt, genre), _ in counts.most_common(options["top"]):
+            if options["force"] or result_cache.get_results(generation, prompt, genre) is None:
+                pending[genre].append(prompt)
+        total = sum(len(prompts) for prompts in pending.values())
+        self.stdout.write(f"📋 {len(counts)} distinct prompts in log, {total} to compute (generation {generation})")
+
+        engine = scoring.get_engine(generation)
+        batch_size = options["batch_size"]
+        warmed = 0
+        for genre, prompts in pending.items():
+            candidate_ids = None
+            if genre:
+                candidate_ids = list(Movie.objects.filter(genres__slug=genre).values_list("id", flat=True))
+            for start in range(0, len(prompts), batch_size):
+                batch = prompts[start:start + batch_size]
+                with instrumentation.span("embedding"):
+                    embeddings = ai.get_embeddings(batch)
+                with instrumentation.span("scoring"):
+                    results = engine.top_k_batch(embeddings, k=settings.RECOMMENDATION_CACHE_K, candidate_ids=candidate_ids)
+                for prompt, prompt_results in zip(batch, results):
+                    result_cache.set_results(generation, prompt, prompt_results, genre)
+                warmed += len(batch)
+                self.stdout.write(f"🔥 Warmed {warmed}/{total}")
+
+        self.stdout.write(self.style.SUCCESS(f"🎯 Finished warming {warmed} prompts"))
+
+    def _read_log(self, path):
+        counts = Counter()
+        try:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entry = json.loads(line)
+                        prompt, genre = entry.get("prompt", ""), entry.get("genre", "")
+                    except (ValueError, AttributeError):
+                        prompt, genre = line, ""
+                    prompt = result_cache.normalize_prompt(prompt)
+                    if prompt:
+                        counts[prompt, genre] += 1
+        except OSError as e:
+            raise CommandError(f"Could not read prompt log {path}: {e}")
+        return counts
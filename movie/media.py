@@ -0,0 +1,309 @@
+"""
+Servir MEDIA_ROOT (pósters) en producción.
+
+- Manifiesto precalculado (``manage.py build_media_manifest``): tamaño,
+  tipo y hash del contenido de cada archivo, guardado como JSON comprimido
+  con gzip. Se carga una vez por proceso, así que servir un archivo
+  conocido no hace ``stat`` en el disco; los que aún no están en el
+  manifiesto (pósters recién generados) se leen del disco y se añaden en
+  memoria.
+- URLs con el hash en el nombre (``m_X.<hash>.png``, filtro ``media_url``):
+  como el contenido de esa URL nunca cambia, se sirven con
+  ``Cache-Control: immutable`` por un año. Las demás llevan ETag y un
+  max-age corto, y el navegador revalida con If-None-Match (304).
+- Con MEDIA_SERVING = 'x-sendfile' o 'x-accel-redirect' el archivo lo envía
+  el servidor web (Apache/lighttpd o nginx) y el worker queda libre; con
+  'app' se usa FileResponse con soporte de Range (206/416).
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.encoding import filepath_to_uri
+from django.utils.http import http_date
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+HASH_LENGTH = 12
+HASHED_NAME = re.compile(r'^(?P<stem>.+)\.(?P<hash>[0-9a-f]{%d})(?P<ext>\.[^./]+)$' % HASH_LENGTH)
+RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def file_hash(path, chunk_size=1024 * 1024):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def describe(root, name, with_hash=True):
+    """Entrada del manifiesto para ``name`` (relativo a ``root``)."""
+    path = os.path.join(root, name)
+    stat = os.stat(path)
+    content_type, encoding = mimetypes.guess_type(name)
+    entry = {
+        'size': stat.st_size,
+        'mtime': int(stat.st_mtime),
+        'content_type': content_type or 'application/octet-stream',
+    }
+    if encoding:
+        entry['encoding'] = encoding
+    if with_hash:
+        entry['hash'] = file_hash(path)
+    return entry
+
+
+def build_manifest(root=None):
+    """Recorre ``root`` (MEDIA_ROOT) y devuelve {nombre relativo: entrada}."""
+    root = str(root or settings.MEDIA_ROOT)
+    manifest = {}
+    for directory, _, files in os.walk(root):
+        for filename in files:
+            if filename.startswith('.'):
+                continue
+            name = os.path.relpath(os.path.join(directory, filename), root).replace(os.sep, '/')
+            manifest[name] = describe(root, name)
+    return manifest
+
+
+def read_manifest(path=None):
+    with gzip.open(str(path or settings.MEDIA_MANIFEST), 'rt', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def update_manifest(names, root=None, path=None):
+    """Recalcula las entradas de ``names`` (p. ej. un póster regenerado con el mismo nombre)."""
+    root = str(root or settings.MEDIA_ROOT)
+    try:
+        manifest = read_manifest(path)
+    except OSError:
+        return  # sin manifiesto: todo se sirve mirando el disco
+    for name in names:
+        try:
+            manifest[name] = describe(root, name)
+        except OSError:
+            manifest.pop(name, None)
+    write_manifest(manifest, path)
+
+
+def write_manifest(manifest, path=None):
+    path = str(path or settings.MEDIA_MANIFEST)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with gzip.open(tmp_path, 'wt', encoding='utf-8') as file:
+        json.dump(manifest, file, separators=(',', ':'), sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+class Manifest:
+    """Manifiesto en memoria; vuelve a leer el archivo si cambió (como mucho cada ``check_interval`` s)."""
+
+    def __init__(self, path, root, check_interval=30):
+        self.path = str(path)
+        self.root = str(root)
+        self.check_interval = check_interval
+        self.entries = {}
+        self._mtime = None
+        self._checked = 0
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        now = time.monotonic()
+        if now - self._checked < self.check_interval:
+            return
+        with self._lock:
+            self._checked = now
+            try:
+                mtime = os.stat(self.path).st_mtime
+            except OSError:
+                return
+            if mtime != self._mtime:
+                self.entries = read_manifest(self.path)
+                self._mtime = mtime
+
+    def get(self, name):
+        """Entrada de ``name``; si no está en el manifiesto se mira el disco (sin hash)."""
+        self._refresh()
+        entry = self.entries.get(name)
+        if entry is None:
+            try:
+                safe_join(self.root, name)
+                if os.path.basename(name).startswith('.'):
+                    return None
+                entry = describe(self.root, name, with_hash=False)
+            except (SuspiciousFileOperation, OSError):
+                return None
+            self.entries[name] = entry
+        return entry
+
+    def forget(self, name):
+        self.entries.pop(name, None)
+
+    @property
+    def version(self):
+        """mtime del manifiesto cargado (None sin archivo): cambia cuando cambian las URLs con hash."""
+        self._refresh()
+        return self._mtime
+
+
+_manifest = None
+
+
+def get_manifest():
+    global _manifest
+    if _manifest is None:
+        _manifest = Manifest(settings.MEDIA_MANIFEST, settings.MEDIA_ROOT, settings.MEDIA_MANIFEST_CHECK_INTERVAL)
+    return _manifest
+
+
+def hashed_name(name):
+    """'movie/images/x.png' -> 'movie/images/x.<hash>.png' si el manifiesto conoce su hash."""
+    entry = get_manifest().get(name)
+    if not entry or 'hash' not in entry:
+        return name
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{entry['hash'][:HASH_LENGTH]}{ext}"
+
+
+def etag(entry):
+    if 'hash' in entry:
+        return f'"{entry["hash"]}"'
+    return f'W/"{entry["size"]:x}-{entry["mtime"]:x}"'
+
+
+def _etag_matches(header, value):
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    # Comparación débil (RFC 9110 §13.1.2): se ignora el prefijo W/
+    tags = {tag.strip().removeprefix('W/') for tag in header.split(',')}
+    return value.removeprefix('W/') in tags
+
+
+def parse_range(header, size):
+    """(inicio, fin) inclusivo de un ``Range: bytes=`` simple; None = archivo entero; ValueError = 416."""
+    match = RANGE.match(header.strip()) if header else None
+    if match is None:
+        return None  # sin Range, o varios rangos: se responde el archivo entero
+    start, end = match.groups()
+    if not start:
+        if not end:
+            return None
+        length = int(end)
+        if length == 0:
+            raise ValueError("Empty suffix range")
+        return max(0, size - length), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or end < start:
+        raise ValueError("Unsatisfiable range")
+    return start, end
+
+
+class _RangeFile:
+    """Lee a lo sumo ``length`` bytes desde ``start`` (para FileResponse)."""
+
+    def __init__(self, file, start, length, block_size=64 * 1024):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+        self.block_size = block_size
+
+    def __iter__(self):
+        while self.remaining > 0:
+            chunk = self.file.read(min(self.block_size, self.remaining))
+            if not chunk:
+                break
+            self.remaining -= len(chunk)
+            yield chunk
+
+    def close(self):
+        self.file.close()
+
+
+def serve(request, path, _retry=True):
+    """Vista para MEDIA_URL: ETag/304, Range y Cache-Control; delega el envío si está configurado."""
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponse(status=405, headers={'Allow': 'GET, HEAD'})
+    name = path.lstrip('/')
+    manifest = get_manifest()
+    immutable = False
+
+    entry = manifest.get(name)
+    if entry is None:
+        match = HASHED_NAME.match(name)
+        if match:
+            name = match['stem'] + match['ext']
+            entry = manifest.get(name)
+            # Un hash viejo sigue sirviendo el archivo actual, pero sin caché permanente
+            immutable = entry is not None and entry.get('hash', '').startswith(match['hash'])
+    if entry is None:
+        raise Http404("Media file not found")
+    try:
+        full_path = safe_join(manifest.root, name)
+    except SuspiciousFileOperation:
+        raise Http404("Media file not found")
+
+    headers = {
+        'ETag': etag(entry),
+        'Last-Modified': http_date(entry['mtime']),
+        'Cache-Control': (f'public, max-age={IMMUTABLE_MAX_AGE}, immutable' if immutable
+                          else f'public, max-age={settings.MEDIA_MAX_AGE}'),
+        'Accept-Ranges': 'bytes',
+    }
+    if _etag_matches(request.headers.get('If-None-Match'), headers['ETag']):
+        return HttpResponseNotModified(headers=headers)
+
+    mode = settings.MEDIA_SERVING
+    if mode in ('x-sendfile', 'x-accel-redirect'):
+        # El servidor web envía el archivo (y resuelve Range); aquí solo cabeceras
+        response = HttpResponse(content_type=entry['content_type'], headers=headers)
+        # Rutas con %-escapes (UTF-8): "?", "#" o espacios del título no deben cortar
+        # la ruta, y las cabeceras solo admiten ASCII (mod_xsendfile y nginx las decodifican)
+        if mode == 'x-sendfile':
+            response['X-Sendfile'] = filepath_to_uri(full_path)
+        else:
+            response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_PREFIX.rstrip('/') + '/' + filepath_to_uri(name)
+        return response
+
+    size = entry['size']
+    byte_range = None
+    if_range = request.headers.get('If-Range')
+    if not if_range or _etag_matches(if_range, headers['ETag']):
+        try:
+            byte_range = parse_range(request.headers.get('Range'), size)
+        except ValueError:
+            return HttpResponse(status=416, headers={**headers, 'Content-Range': f'bytes */{size}'})
+
+    try:
+        file = open(full_path, 'rb')
+    except OSError:
+        manifest.forget(name)
+        raise Http404("Media file not found")
+    stat = os.fstat(file.fileno())
+    if _retry and (stat.st_size != size or int(stat.st_mtime) != entry['mtime']):
+        # El archivo cambió desde el manifiesto: no sirvas un tamaño ni un ETag viejos
+        file.close()
+        manifest.forget(name)
+        return serve(request, name, _retry=False)
+    if byte_range is None:
+        response = FileResponse(file, content_type=entry['content_type'], headers=headers)
+        response['Content-Length'] = str(size)
+    else:
+        start, end = byte_range
+        response = FileResponse(_RangeFile(file, start, end - start + 1), status=206,
+                                content_type=entry['content_type'], headers=headers)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(end - start + 1)
+    if 'encoding' in entry:
+        response['Content-Encoding'] = entry['encoding']
+    return response
@@ -0,0 +1,65 @@
+import logging
+import os
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from . import instrumentation
+
+logger = logging.getLogger('movie.profiling')
+
+
+class InstrumentationMiddleware:
+    """
+    Mide cada petición (spans, consultas SQL) y agrega la cabecera Server-Timing.
+
+    Si MOVIE_INSTRUMENTATION está desactivado, Django descarta el middleware
+    al arrancar, así que no añade ningún costo por petición.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'MOVIE_INSTRUMENTATION', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with instrumentation.collect('request') as trace:
+            response = self.get_response(request)
+            match = getattr(request, 'resolver_match', None)
+            trace.label = match.url_name if match and match.url_name else 'unresolved'
+        response['Server-Timing'] = trace.server_timing()
+        return response
+
+
+class ProfilingMiddleware:
+    """
+    Perfilado opt-in de peticiones individuales para usuarios staff.
+
+    Se activa con ``?profile=cprofile|sample`` o con la cabecera
+    ``X-Profile``. La respuesta incluye ``X-Profile-File`` con el nombre del
+    archivo guardado en PROFILE_DIR y el resumen se envía al logger
+    ``movie.profiling``. Si MOVIE_PROFILING está desactivado, el middleware
+    se descarta al arrancar.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'MOVIE_PROFILING', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = request.GET.get('profile') or request.headers.get('X-Profile')
+        user = getattr(request, 'user', None)
+        if not mode or user is None or not user.is_staff:
+            return self.get_response(request)
+
+        from . import profiling
+
+        if mode not in profiling.MODES:
+            mode = 'cprofile'
+        name = 'request-' + (request.path.strip('/').replace('/', '_') or 'root')
+        with profiling.profile(name, mode) as result:
+            response = self.get_response(request)
+        logger.info("Profile for %s %s saved to %s\n%s", request.method, request.path, result.path, result.summary)
+        response['X-Profile-File'] = os.path.basename(result.path)
+        return response
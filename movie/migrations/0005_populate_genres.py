@@ -0,0 +1,42 @@
+import re
+
+from django.db import migrations
+from django.utils.text import slugify
+
+
+def populate_genres(apps, schema_editor):
+    """Llena Genre/MovieGenre a partir del texto de Movie.genre."""
+    Movie = apps.get_model('movie', 'Movie')
+    Genre = apps.get_model('movie', 'Genre')
+    MovieGenre = apps.get_model('movie', 'MovieGenre')
+
+    genres = {}
+    rows = []
+    for movie_id, raw in Movie.objects.values_list('id', 'genre').iterator(chunk_size=2000):
+        seen = set()
+        for part in re.split(r'[,/|;]', raw or ''):
+            name = part.strip()
+            slug = slugify(name)
+            if not slug or slug in seen:
+                continue
+            seen.add(slug)
+            if slug not in genres:
+                genres[slug] = Genre.objects.create(slug=slug, name=name)
+            rows.append(MovieGenre(movie_id=movie_id, genre=genres[slug], position=len(seen) - 1))
+    MovieGenre.objects.bulk_create(rows, batch_size=500)
+
+
+def clear_genres(apps, schema_editor):
+    apps.get_model('movie', 'MovieGenre').objects.all().delete()
+    apps.get_model('movie', 'Genre').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie', '0004_genre_moviegenre'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_genres, clear_genres),
+    ]
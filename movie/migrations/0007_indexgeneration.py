@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:09
+
+from django.db import migrations, models
+
+
+def create_embeddings_generation(apps, schema_editor):
+    IndexGeneration = apps.get_model('movie', 'IndexGeneration')
+    IndexGeneration.objects.get_or_create(name='embeddings', defaults={'value': 1})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie', '0006_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndexGeneration',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('value', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_embeddings_generation, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie', '0007_indexgeneration'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Cluster',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('centroid', models.BinaryField()),
+                ('size', models.PositiveIntegerField(default=0)),
+                ('label', models.CharField(blank=True, max_length=200)),
+                ('representative_ids', models.JSONField(default=list)),
+                ('generation', models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-size'],
+            },
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='cluster',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='movies', to='movie.cluster'),
+        ),
+    ]
@@ -1,8 +1,12 @@
+import random
+from array import array
+
 from django.db import models
-import numpy as np
+from django.utils import timezone
 
 def get_default_array():
-    default_arr = np.random.rand(1536)
+    # Mismos bytes que np.random.rand(1536).tobytes() (float64), sin importar numpy al cargar los modelos
+    default_arr = array('d', (random.random() for _ in range(1536)))
     return default_arr.tobytes()
 
 class Movie(models.Model): 
@@ -13,6 +17,168 @@ class Movie(models.Model):
     genre = models.CharField(blank=True, max_length=250)
     year = models.IntegerField(blank=True, null=True)
     emb = models.BinaryField(default=get_default_array())
+    genres = models.ManyToManyField('Genre', through='MovieGenre', related_name='movies', blank=True)
+    cluster = models.ForeignKey('Cluster', null=True, blank=True, on_delete=models.SET_NULL, related_name='movies')
+    # Versión de la fila: clave de la caché de fragmentos de cada tarjeta (home.html)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self): 
-        return self.title
\ No newline at end of file
+        return self.title
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Valores tal como se leyeron de la BD, para detectar cambios al guardar
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def has_changed(self, field_name):
+        """True si el campo difiere de lo leído en la BD (o si no se leyó de la BD)."""
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None or field_name not in loaded:
+            return True
+        return self.__dict__.get(field_name, loaded[field_name]) != loaded[field_name]
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'updated_at' not in update_fields:
+            # auto_now no se aplica a los campos que no están en update_fields
+            kwargs['update_fields'] = [*update_fields, 'updated_at']
+        super().save(*args, **kwargs)
+        # Los receptores de post_save ya vieron los cambios; ahora lo guardado es el nuevo punto de partida
+        loaded = getattr(self, '_loaded_values', None) or {}
+        for field in self._meta.concrete_fields:
+            if field.attname in self.__dict__:
+                loaded[field.attname] = self.__dict__[field.attname]
+        self._loaded_values = loaded
+
+
+class Genre(models.Model):
+    name = models.CharField(max_length=100)
+    slug = models.SlugField(max_length=100, unique=True)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+
+class MovieGenre(models.Model):
+    """Tabla intermedia Movie <-> Genre; position 0 es el primer género del campo genre."""
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='movie_genres')
+    genre = models.ForeignKey(Genre, on_delete=models.CASCADE, related_name='movie_genres')
+    position = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['movie', 'genre'], name='unique_movie_genre'),
+        ]
+        indexes = [
+            models.Index(fields=['genre', 'movie'], name='movie_genre_lookup_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.movie} - {self.genre}"
+
+class Job(models.Model):
+    """
+    Trabajo en segundo plano sobre una película (cola local en la BD).
+
+    Solo puede haber un trabajo pendiente por película y tipo: volver a
+    encolarlo mientras espera no crea otro. Lo procesa `manage.py run_jobs`.
+    """
+    EMBEDDING = 'embedding'
+    DESCRIPTION = 'description'
+    IMAGE = 'image'
+    KIND_CHOICES = [
+        (EMBEDDING, 'Embedding'),
+        (DESCRIPTION, 'Description'),
+        (IMAGE, 'Image'),
+    ]
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='jobs')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    priority = models.SmallIntegerField(default=0)  # mayor = antes
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=64, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['movie', 'kind'],
+                condition=models.Q(status='pending'),
+                name='unique_pending_job_per_movie_kind',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'priority', 'run_after'], name='movie_job_claim_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} job for {self.movie_id} ({self.status})"
+
+
+class IndexGeneration(models.Model):
+    """
+    Contador que sube cada vez que cambian los embeddings del catálogo.
+
+    Las cachés y el índice de similitud se etiquetan con este número, así
+    que lo calculado con una generación anterior simplemente deja de usarse.
+    """
+    EMBEDDINGS = 'embeddings'
+    CLUSTERS = 'clusters'
+
+    name = models.CharField(max_length=50, unique=True)
+    value = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+    @classmethod
+    def current(cls, name=EMBEDDINGS):
+        return cls.objects.filter(name=name).values_list('value', flat=True).first() or 0
+
+    @classmethod
+    def bump(cls, name=EMBEDDINGS):
+        if cls.objects.filter(name=name).update(value=models.F('value') + 1):
+            return
+        _, created = cls.objects.get_or_create(name=name, defaults={'value': 1})
+        if not created:
+            # Otro proceso creó la fila entre el update y el get_or_create: su subida no cuenta por la nuestra
+            cls.objects.filter(name=name).update(value=models.F('value') + 1)
+
+
+class Cluster(models.Model):
+    """
+    Grupo temático del catálogo, calculado con `manage.py cluster_movies`
+    (k-means por mini-lotes sobre los embeddings).
+    """
+    centroid = models.BinaryField()  # float32 normalizado, misma dimensión que los embeddings
+    size = models.PositiveIntegerField(default=0)
+    label = models.CharField(max_length=200, blank=True)  # géneros más frecuentes del grupo
+    representative_ids = models.JSONField(default=list)  # películas más cercanas al centroide
+    generation = models.PositiveBigIntegerField(default=0)  # generación de embeddings usada
+
+    class Meta:
+        ordering = ['-size']
+
+    def __str__(self):
+        return self.label or f"Cluster {self.pk}"
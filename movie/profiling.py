@@ -0,0 +1,133 @@
+"""
+Perfilado bajo demanda para management commands y peticiones de staff.
+
+Dos modos:
+
+- ``cprofile``: perfil determinista con cProfile, guardado como ``.prof``
+  (se abre con ``python -m pstats`` o snakeviz).
+- ``sample``: muestreo periódico de la pila del hilo, guardado como
+  ``.collapsed`` (formato de flamegraph.pl / speedscope).
+
+Nada de esto se importa ni se ejecuta si no se pide un perfil.
+"""
+import io
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+
+MODES = ('cprofile', 'sample')
+
+
+def get_profile_dir():
+    profile_dir = getattr(settings, 'PROFILE_DIR', None) or os.path.join(settings.BASE_DIR, 'profiles')
+    os.makedirs(profile_dir, exist_ok=True)
+    return profile_dir
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}:{code.co_firstlineno}"
+
+
+class SamplingProfiler:
+    """Toma la pila de un hilo cada ``interval`` segundos desde un hilo aparte."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='movie-sampler', daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(labels))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path):
+        with open(path, 'w', encoding='utf-8') as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f"{stack} {count}\n")
+
+    def summary(self, limit):
+        """Funciones con más muestras, tanto propias (self) como acumuladas."""
+        total = sum(self.stacks.values()) or 1
+        own = Counter()
+        cumulative = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(';')
+            own[frames[-1]] += count
+            for label in set(frames):
+                cumulative[label] += count
+        lines = [f"{total} samples every {self.interval * 1000:.1f} ms", "   self%   cum%  function"]
+        for label, count in own.most_common(limit):
+            lines.append(f"  {100 * count / total:6.1f} {100 * cumulative[label] / total:6.1f}  {label}")
+        return '\n'.join(lines)
+
+
+class ProfileResult:
+    def __init__(self, mode):
+        self.mode = mode
+        self.path = None
+        self.summary = ''
+
+
+@contextmanager
+def profile(name, mode='cprofile', limit=25):
+    """
+    Perfila el bloque ``with`` y guarda el resultado en PROFILE_DIR.
+
+    Al salir, ``result.path`` apunta al archivo y ``result.summary`` contiene
+    las ``limit`` funciones más costosas.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown profile mode {mode!r}, expected one of {MODES}")
+
+    result = ProfileResult(mode)
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    base = os.path.join(get_profile_dir(), f"{name}-{stamp}-{os.getpid()}")
+
+    if mode == 'cprofile':
+        import cProfile
+        import pstats
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield result
+        finally:
+            profiler.disable()
+            result.path = base + '.prof'
+            profiler.dump_stats(result.path)
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(limit)
+            result.summary = out.getvalue()
+    else:
+        interval = getattr(settings, 'PROFILE_SAMPLE_INTERVAL', 0.005)
+        sampler = SamplingProfiler(threading.get_ident(), interval)
+        sampler.start()
+        try:
+            yield result
+        finally:
+            sampler.stop()
+            result.path = base + '.collapsed'
+            sampler.write(result.path)
+            result.summary = sampler.summary(limit)
@@ -0,0 +1,68 @@
+"""
+Caché de resultados de /recommend/.
+
+Guarda el top-k (ids y similitud) de cada prompt normalizado + filtros. La
+clave incluye la generación del índice (IndexGeneration), que sube cada vez
+que cambian embeddings: las entradas viejas simplemente dejan de consultarse
+y expiran solas, sin tener que vaciar la caché. Los resultados aproximados
+del filtro por grupos se guardan aparte, con la generación de los grupos y
+el número de grupos consultados en la clave.
+
+Tamaño máximo, TTL y desalojo LRU los da el backend configurado en
+``CACHES['recommendations']`` (LocMemCache por defecto). LocMemCache es por
+proceso; para que ``warm_recommendations`` caliente la caché de los workers
+web hay que usar un backend compartido (Redis, Memcached, DB o archivos).
+"""
+import hashlib
+import json
+import logging
+
+from django.conf import settings
+from django.core.cache import caches
+
+CACHE_ALIAS = 'recommendations'
+
+prompt_logger = logging.getLogger('movie.prompts')
+
+
+def normalize_prompt(prompt):
+    """Minúsculas y espacios colapsados: "Una  Comedia " == "una comedia"."""
+    return ' '.join(prompt.lower().split())
+
+
+EXACT = 'exact'
+
+
+def cluster_variant(clusters_generation, probes):
+    """Variante de los resultados aproximados (RECOMMEND_CLUSTER_PROBES > 0): cambia si se reagrupa el catálogo."""
+    return f"c{clusters_generation}p{probes}"
+
+
+def make_key(generation, prompt, genre='', k=None, variant=EXACT):
+    k = k or settings.RECOMMENDATION_CACHE_K
+    payload = json.dumps([normalize_prompt(prompt), genre or '', k], ensure_ascii=False)
+    return f"rec:{generation}:{variant}:{hashlib.sha1(payload.encode('utf-8')).hexdigest()}"
+
+
+def get_results(generation, prompt, genre='', k=None, variants=(EXACT,)):
+    """
+    Lista de (movie_id, similitud) cacheada, o None si no está. Con varias
+    ``variants`` se leen todas a la vez y gana la primera presente (p. ej.
+    los resultados exactos de ``warm_recommendations`` antes que los aproximados).
+    """
+    keys = [make_key(generation, prompt, genre, k, variant) for variant in variants]
+    found = caches[CACHE_ALIAS].get_many(keys)
+    for key in keys:
+        if key in found:
+            return [tuple(item) for item in found[key]]
+    return None
+
+
+def set_results(generation, prompt, results, genre='', k=None, variant=EXACT):
+    results = [(int(movie_id), float(score)) for movie_id, score in results]
+    caches[CACHE_ALIAS].set(make_key(generation, prompt, genre, k, variant), results)
+
+
+def log_prompt(prompt, genre=''):
+    """Una línea JSON por consulta; ``warm_recommendations`` lee este log."""
+    prompt_logger.info(json.dumps({'prompt': normalize_prompt(prompt), 'genre': genre or ''}, ensure_ascii=False))
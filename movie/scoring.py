@@ -0,0 +1,371 @@
+"""
+Motor de puntuación por similitud de coseno para catálogos grandes.
+
+Los embeddings se normalizan una vez y se guardan en un ``.npy`` que se abre
+con ``mmap_mode='r'``: los shards son vistas (filas ``start:stop``) sobre el
+mismo archivo, así que ningún worker copia la matriz. Cada consulta se
+reparte entre los shards en un pool persistente (hilos por defecto: numpy
+libera el GIL en el producto matriz-vector; o procesos, que abren el mismo
+archivo mapeado) y se combinan los top-k de cada shard con un heap.
+
+Uso típico desde las vistas:
+
+    engine = scoring.get_engine()
+    [(movie_id, score)] = engine.top_k(prompt_emb, k=1)
+"""
+import heapq
+import itertools
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Count
+from django.db.models.functions import Length
+
+from . import ai, instrumentation
+
+_build_counter = itertools.count()
+
+
+class EmbeddingIndex:
+    """Ids y matriz (N, D) de embeddings normalizados, mapeada desde disco."""
+
+    def __init__(self, ids_path, matrix_path):
+        self.ids_path = ids_path
+        self.matrix_path = matrix_path
+        self.ids = np.load(ids_path)
+        self.matrix = np.load(matrix_path, mmap_mode='r')
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def dim(self):
+        return self.matrix.shape[1] if self.matrix.ndim == 2 else 0
+
+    @classmethod
+    def from_array(cls, ids, matrix, directory, prefix='embeddings'):
+        """Normaliza ``matrix`` por filas y la escribe en ``directory``."""
+        os.makedirs(directory, exist_ok=True)
+        ids_path, matrix_path = cls._paths(directory, prefix)
+        tmp_path = _tmp_path(matrix_path)
+        out = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32, shape=matrix.shape)
+        for start in range(0, len(matrix), 8192):
+            out[start:start + 8192] = _normalize(np.asarray(matrix[start:start + 8192], dtype=np.float32))
+        out.flush()
+        del out
+        _save_atomic(ids_path, np.asarray(ids, dtype=np.int64))
+        os.replace(tmp_path, matrix_path)
+        return cls(ids_path, matrix_path)
+
+    @classmethod
+    def from_queryset(cls, queryset, directory, prefix='embeddings', chunk_size=2000, token=None, dim=None):
+        """
+        Recorre ``queryset`` por bloques y escribe la matriz sin cargarla entera.
+
+        ``dim`` es la dimensión esperada (la del modelo de embeddings); si no
+        se da, se usa el tamaño float32 más repetido. Las filas con otra
+        longitud (p. ej. el valor por defecto aleatorio en float64) se
+        omiten. Con ``token`` los archivos tienen un nombre fijo que otros
+        procesos pueden abrir con ``open()``.
+        """
+        os.makedirs(directory, exist_ok=True)
+        ids_path, matrix_path = cls._paths(directory, prefix, token)
+        tmp_path = _tmp_path(matrix_path)
+        if dim is None:
+            dim = most_common_emb_size(queryset) // 4
+        rows = queryset.values_list('id', 'emb').order_by('id')
+        capacity = rows.count() if dim else 0
+
+        ids = np.empty(capacity, dtype=np.int64)
+        out = None
+        if capacity:
+            out = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32, shape=(capacity, dim))
+        n = 0
+        fetched = 0
+        chunk_ids, chunk_embs = [], []
+
+        def flush():
+            nonlocal n
+            if chunk_ids:
+                block = np.frombuffer(b''.join(chunk_embs), dtype=np.float32).reshape(len(chunk_ids), -1)
+                out[n:n + len(block)] = _normalize(block)
+                ids[n:n + len(block)] = chunk_ids
+                n += len(block)
+                chunk_ids.clear()
+                chunk_embs.clear()
+
+        for movie_id, emb in (rows.iterator(chunk_size=chunk_size) if capacity else ()):
+            emb = bytes(emb)
+            fetched += len(emb)
+            if len(emb) != dim * 4 or n + len(chunk_ids) >= capacity:
+                continue
+            chunk_ids.append(movie_id)
+            chunk_embs.append(emb)
+            if len(chunk_ids) >= chunk_size:
+                flush()
+        instrumentation.incr('bytes.emb', fetched)
+
+        if out is None:
+            _save_atomic(matrix_path, np.zeros((0, 0), dtype=np.float32))
+        else:
+            flush()
+            out.flush()
+            del out
+            if n != capacity:
+                # Recortar las filas omitidas: se copia solo la parte válida
+                full = np.load(tmp_path, mmap_mode='r')
+                trimmed_path = tmp_path + '.trimmed'
+                trimmed = np.lib.format.open_memmap(trimmed_path, mode='w+', dtype=np.float32, shape=(n, dim))
+                trimmed[:] = full[:n]
+                trimmed.flush()
+                del full, trimmed
+                os.remove(tmp_path)
+                os.replace(trimmed_path, matrix_path)
+            else:
+                os.replace(tmp_path, matrix_path)
+        _save_atomic(ids_path, ids[:n])
+        return cls(ids_path, matrix_path)
+
+    @classmethod
+    def open(cls, directory, prefix, token):
+        """Índice ya escrito con ese ``token`` (por este u otro proceso), o None."""
+        ids_path, matrix_path = cls._paths(directory, prefix, token)
+        if os.path.exists(ids_path) and os.path.exists(matrix_path):
+            return cls(ids_path, matrix_path)
+        return None
+
+    @staticmethod
+    def _paths(directory, prefix, token=None):
+        if token is None:
+            token = f"{os.getpid()}-{next(_build_counter)}"
+        name = f"{prefix}-{token}"
+        return os.path.join(directory, name + '-ids.npy'), os.path.join(directory, name + '.npy')
+
+    def shards(self, n_shards):
+        """Rangos (start, stop) contiguos y de tamaño parecido."""
+        n = len(self)
+        n_shards = max(1, min(n_shards, n))
+        bounds = np.linspace(0, n, n_shards + 1, dtype=np.int64)
+        return [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+    def delete_files(self):
+        for path in (self.ids_path, self.matrix_path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def most_common_emb_size(queryset):
+    """Tamaño en bytes de emb más repetido, redondeado a float32 (0 si no hay filas)."""
+    sizes = (queryset.order_by().annotate(size=Length('emb'))
+             .values('size').annotate(n=Count('pk')).order_by('-n', '-size'))
+    for row in sizes:
+        if row['size'] and row['size'] % 4 == 0:
+            return row['size']
+    return 0
+
+
+def _tmp_path(path):
+    # Único por escritor: dos procesos pueden construir la misma generación a la vez
+    return f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+
+
+def _save_atomic(path, array):
+    tmp_path = _tmp_path(path)
+    with open(tmp_path, 'wb') as file:
+        np.save(file, array)
+    os.replace(tmp_path, path)
+
+
+def _normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0  # vectores nulos quedan en cero (similitud 0)
+    return matrix / norms
+
+
+# Si los candidatos son menos de esta fracción del shard, se puntúan solo sus filas
+GATHER_FRACTION = 0.25
+
+
+def _score_rows(matrix, ids, start, stop, queries, k, allowed):
+    """
+    Top-k de las filas ``start:stop`` para cada consulta de ``queries`` (Q, D).
+
+    Devuelve una lista (una por consulta) de listas ``(score, id)``.
+    """
+    block = matrix[start:stop]
+    block_ids = ids[start:stop]
+    if allowed is None:
+        scores = queries @ block.T  # (Q, filas)
+    else:
+        mask = np.isin(block_ids, allowed, assume_unique=True)
+        selected = np.count_nonzero(mask)
+        if not selected:
+            return [[] for _ in range(len(queries))]
+        if selected < len(block_ids) * GATHER_FRACTION:
+            # Pocos candidatos (género, grupos cercanos): leer y puntuar solo esas filas
+            rows = np.flatnonzero(mask)
+            scores = queries @ block[rows].T
+        else:
+            scores = (queries @ block.T)[:, mask]
+        block_ids = block_ids[mask]
+    kk = min(k, scores.shape[1])
+    if kk == 0:
+        return [[] for _ in range(len(queries))]
+    top = np.argpartition(-scores, kk - 1, axis=1)[:, :kk]
+    return [
+        [(float(scores[q, j]), int(block_ids[j])) for j in top[q]]
+        for q in range(len(queries))
+    ]
+
+
+# --- Estado de los workers del pool de procesos (cada proceso abre el mismo .npy) ---
+_worker_index = None
+
+
+def _init_worker(ids_path, matrix_path):
+    global _worker_index
+    _worker_index = EmbeddingIndex(ids_path, matrix_path)
+
+
+def _score_in_worker(start, stop, queries, k, allowed):
+    return _score_rows(_worker_index.matrix, _worker_index.ids, start, stop, queries, k, allowed)
+
+
+class ScoringEngine:
+    """Reparte las consultas entre shards del índice en un pool persistente."""
+
+    def __init__(self, index, workers=1, shards=None, executor='thread', min_shard_rows=0, generation=None):
+        self.index = index
+        self.generation = generation
+        self.workers = max(1, workers)
+        n_shards = shards or self.workers
+        if min_shard_rows:
+            n_shards = min(n_shards, max(1, len(index) // min_shard_rows))
+        self.shard_bounds = index.shards(n_shards)
+        self.executor = executor
+        self._pool = None
+        if self.workers > 1 and len(self.shard_bounds) > 1:
+            if executor == 'process':
+                self._pool = ProcessPoolExecutor(
+                    self.workers, initializer=_init_worker, initargs=(index.ids_path, index.matrix_path))
+            else:
+                self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix='movie-scoring')
+
+    def __len__(self):
+        return len(self.index)
+
+    def top_k(self, query, k=1, candidate_ids=None):
+        """[(movie_id, score)] de las ``k`` películas más parecidas a ``query``."""
+        return self.top_k_batch(np.asarray(query, dtype=np.float32)[None, :], k, candidate_ids)[0]
+
+    def top_k_batch(self, queries, k=1, candidate_ids=None):
+        """
+        Versión por lotes: ``queries`` (Q, D) se puntúa como un producto
+        matriz-matriz por shard. Devuelve una lista de resultados por consulta.
+        """
+        queries = _normalize(np.atleast_2d(np.asarray(queries, dtype=np.float32)))
+        if len(self.index) == 0 or queries.shape[1] != self.index.dim:
+            return [[] for _ in range(len(queries))]
+        allowed = None
+        if candidate_ids is not None:
+            allowed = np.unique(np.asarray(list(candidate_ids), dtype=np.int64))
+
+        partials = None
+        pool = self._pool
+        if pool is not None:
+            try:
+                if self.executor == 'process':
+                    futures = [pool.submit(_score_in_worker, start, stop, queries, k, allowed)
+                               for start, stop in self.shard_bounds]
+                else:
+                    futures = [pool.submit(_score_rows, self.index.matrix, self.index.ids, start, stop, queries, k, allowed)
+                               for start, stop in self.shard_bounds]
+                partials = [future.result() for future in futures]
+            except RuntimeError:
+                # El pool se cerró (invalidate() en otro hilo): puntuar aquí mismo
+                partials = None
+        if partials is None:
+            partials = [_score_rows(self.index.matrix, self.index.ids, start, stop, queries, k, allowed)
+                        for start, stop in self.shard_bounds]
+
+        results = []
+        for q in range(len(queries)):
+            best = heapq.nlargest(k, itertools.chain.from_iterable(partial[q] for partial in partials))
+            results.append([(movie_id, score) for score, movie_id in best])
+        return results
+
+    def close(self, delete_files=True):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        if delete_files:
+            self.index.delete_files()
+
+
+# --- Motor compartido por el proceso ---
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine(generation=None):
+    """
+    Motor de la generación actual del índice (IndexGeneration).
+
+    Si otro proceso cambió embeddings, la generación subió y el motor se
+    reconstruye; el archivo de cada generación se comparte entre procesos.
+    """
+    global _engine
+    from .models import IndexGeneration, Movie
+
+    if generation is None:
+        generation = IndexGeneration.current()
+    engine = _engine
+    if engine is not None and engine.generation == generation:
+        return engine
+    with _engine_lock:
+        if _engine is None or _engine.generation != generation:
+            directory = settings.SCORING_INDEX_DIR
+            token = f"gen{generation}"
+            with instrumentation.span('index.build'):
+                index = EmbeddingIndex.open(directory, 'embeddings', token)
+                if index is None:
+                    index = EmbeddingIndex.from_queryset(Movie.objects.all(), directory, token=token,
+                                                          dim=ai.EMBEDDING_DIM)
+            old, _engine = _engine, ScoringEngine(
+                index,
+                workers=settings.SCORING_WORKERS,
+                shards=settings.SCORING_SHARDS,
+                executor=settings.SCORING_EXECUTOR,
+                min_shard_rows=settings.SCORING_MIN_SHARD_ROWS,
+                generation=generation,
+            )
+            if old is not None:
+                old.close(delete_files=False)
+            _remove_old_generations(directory, generation)
+        return _engine
+
+
+def _remove_old_generations(directory, generation):
+    # Los procesos que aún tengan mapeado un archivo borrado lo siguen leyendo sin problema
+    for name in os.listdir(directory):
+        match = re.match(r'embeddings-gen(\d+)(-ids)?\.npy$', name)
+        if match and int(match.group(1)) < generation:
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+
+
+def invalidate():
+    """Descarta el motor actual; el próximo get_engine() lo vuelve a abrir."""
+    global _engine
+    with _engine_lock:
+        engine, _engine = _engine, None
+    if engine is not None:
+        engine.close(delete_files=False)
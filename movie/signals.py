@@ -0,0 +1,75 @@
+import sys
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .genres import sync_movie_genres
+from .models import IndexGeneration, Job, Movie
+
+
+@receiver(post_save, sender=Movie)
+def sync_genres_on_save(sender, instance, created, update_fields, raw, **kwargs):
+    """Mantiene MovieGenre al día cuando cambia el texto de Movie.genre."""
+    if raw:
+        return
+    if update_fields is not None and 'genre' not in update_fields:
+        return
+    if not created and not instance.has_changed('genre'):
+        return
+    sync_movie_genres(instance)
+
+
+def _invalidate_scoring_engine():
+    # Solo si este proceso ya cargó el motor; si no, no hay nada que descartar
+    scoring = sys.modules.get('movie.scoring')
+    if scoring is not None:
+        scoring.invalidate()
+
+
+def embeddings_changed():
+    """
+    Sube la generación del índice (todas las cachés y procesos la verán) y
+    descarta el motor local. Llamar también tras escrituras en bloque
+    (bulk_update/bulk_create), que no disparan post_save.
+    """
+    IndexGeneration.bump()
+    _invalidate_scoring_engine()
+
+
+@receiver(post_save, sender=Movie)
+def invalidate_engine_on_save(sender, instance, created, update_fields, **kwargs):
+    if update_fields is not None and 'emb' not in update_fields:
+        return
+    if created or instance.has_changed('emb'):
+        embeddings_changed()
+
+
+@receiver(post_delete, sender=Movie)
+def invalidate_engine_on_delete(sender, instance, **kwargs):
+    embeddings_changed()
+
+
+@receiver(post_save, sender=Movie)
+def enqueue_refresh_jobs(sender, instance, created, update_fields, raw, **kwargs):
+    """
+    Encola los trabajos que dependen de lo que cambió:
+    título -> descripción y póster; descripción -> embedding.
+    """
+    if raw or not getattr(settings, 'MOVIE_JOBS_AUTO_ENQUEUE', False):
+        return
+
+    def changed(field):
+        return (update_fields is None or field in update_fields) and (created or instance.has_changed(field))
+
+    kinds = []
+    if created:
+        kinds = [Job.EMBEDDING, Job.IMAGE]
+    else:
+        if changed('title'):
+            kinds += [Job.DESCRIPTION, Job.IMAGE]
+        if changed('description'):
+            kinds.append(Job.EMBEDDING)
+    if kinds:
+        from .jobs import enqueue_on_commit
+        enqueue_on_commit(instance.pk, kinds)
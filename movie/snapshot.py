@@ -0,0 +1,225 @@
+"""
+Snapshot columnar del catálogo (Movie + embeddings) en un archivo ``.npz``.
+
+Cada columna es un array de NumPy dentro del zip, así que el archivo se
+puede abrir con ``np.load`` sin este módulo:
+
+- ``ids``, ``year`` / ``year_isnull``: enteros por fila.
+- ``<campo>`` + ``<campo>_offsets`` para los textos (title, description,
+  image, url, genre): todos los valores en UTF-8 concatenados en un solo
+  blob; la fila i es ``blob[offsets[i]:offsets[i + 1]]``.
+- ``embeddings``: matriz float32 (N, D) con los embeddings del tamaño más
+  común; ``emb_in_matrix`` indica qué filas están ahí. Los demás (p. ej. el
+  valor por defecto aleatorio) van byte a byte en ``emb_extra`` con sus
+  offsets, así que el snapshot no pierde nada.
+
+La matriz se escribe y se lee por bloques, sin tenerla entera en memoria.
+Solo se guardan las rutas de las imágenes, no los archivos de media/.
+"""
+import os
+import zipfile
+from contextlib import contextmanager
+
+import numpy as np
+from django.db import connection, connections, transaction
+
+from . import instrumentation
+from .genres import sync_genres
+from .models import Job, Movie, MovieGenre
+from .scoring import most_common_emb_size
+from .signals import embeddings_changed
+
+FORMAT_VERSION = 1
+TEXT_FIELDS = ('title', 'description', 'image', 'url', 'genre')
+
+
+def export_snapshot(path, queryset=None, chunk_size=2000):
+    """Escribe las películas de ``queryset`` (todas por defecto) en ``path``; devuelve cuántas."""
+    queryset = (Movie.objects.all() if queryset is None else queryset).order_by('pk')
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    # Una sola transacción de lectura: el conteo y la lectura ven el mismo estado de la tabla
+    with _read_transaction(queryset.db):
+        total = queryset.count()
+        emb_size = most_common_emb_size(queryset)
+        dim = emb_size // 4
+
+        ids = np.zeros(total, dtype=np.int64)
+        years = np.zeros(total, dtype=np.int64)
+        year_isnull = np.zeros(total, dtype=bool)
+        in_matrix = np.zeros(total, dtype=bool)
+        texts = {field: [] for field in TEXT_FIELDS}
+        extra = []
+
+        with zipfile.ZipFile(tmp_path, 'w', allowZip64=True) as archive:
+            with archive.open('embeddings.npy', 'w', force_zip64=True) as fp:
+                _write_header(fp, np.float32, (total, dim))
+                rows = queryset.values_list('pk', *TEXT_FIELDS, 'year', 'emb').iterator(chunk_size=chunk_size)
+                chunk = np.zeros((chunk_size, dim), dtype=np.float32)
+                filled = i = 0
+                with instrumentation.span('snapshot.read'):
+                    for i, (pk, *values, year, emb) in enumerate(rows):
+                        if i >= total:
+                            raise RuntimeError("Movie table changed during export")
+                        ids[i] = pk
+                        for field, value in zip(TEXT_FIELDS, values):
+                            texts[field].append(value or '')
+                        if year is None:
+                            year_isnull[i] = True
+                        else:
+                            years[i] = year
+                        emb = bytes(emb)
+                        if dim and len(emb) == emb_size:
+                            in_matrix[i] = True
+                            chunk[filled] = np.frombuffer(emb, dtype=np.float32)
+                            extra.append(b'')
+                        else:
+                            chunk[filled] = 0
+                            extra.append(emb)
+                        filled += 1
+                        if filled == chunk_size:
+                            fp.write(chunk.tobytes())
+                            filled = 0
+                    if filled:
+                        fp.write(chunk[:filled].tobytes())
+
+            if len(extra) != total:
+                raise RuntimeError("Movie table changed during export")
+            columns = {
+                'format_version': np.array(FORMAT_VERSION, dtype=np.int64),
+                'ids': ids,
+                'year': years,
+                'year_isnull': year_isnull,
+                'emb_in_matrix': in_matrix,
+            }
+            for field, values in texts.items():
+                columns[field], columns[f'{field}_offsets'] = _pack([value.encode('utf-8') for value in values])
+            columns['emb_extra'], columns['emb_extra_offsets'] = _pack(extra)
+            with instrumentation.span('snapshot.write'):
+                for name, array in columns.items():
+                    with archive.open(f'{name}.npy', 'w', force_zip64=True) as fp:
+                        np.lib.format.write_array(fp, array, allow_pickle=False)
+
+    os.replace(tmp_path, path)
+    return total
+
+
+@contextmanager
+def _read_transaction(using):
+    """
+    Instantánea de lectura consistente sin tomar el lock de escritura.
+
+    Con SQLite, ``atomic()`` abre ``BEGIN IMMEDIATE`` (transaction_mode en
+    settings) y bloquearía a los demás escritores toda la exportación. Un
+    ``BEGIN`` diferido solo lee: con WAL los escritores siguen trabajando y
+    esta conexión ve el estado del primer SELECT hasta el COMMIT.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        # En otros motores una transacción de solo lectura no bloquea a los escritores
+        with transaction.atomic(using=using):
+            yield
+        return
+    if connection.in_atomic_block:
+        yield  # ya dentro de una transacción de quien llama
+        return
+    connection.ensure_connection()
+    with connection.cursor() as cursor:
+        cursor.execute('BEGIN DEFERRED')
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute('COMMIT')
+
+
+def import_snapshot(path, chunk_size=2000, replace=False):
+    """
+    Carga ``path`` con ``bulk_create`` por bloques, conservando los ids.
+
+    La tabla Movie debe estar vacía salvo con ``replace=True``, que borra
+    antes el catálogo actual (con sus géneros y trabajos). No dispara
+    post_save, así que no se encolan trabajos ni se llama a la API.
+    """
+    with np.load(path, allow_pickle=False) as data:
+        version = int(data['format_version'])
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot format version {version} (expected {FORMAT_VERSION})")
+        ids = data['ids']
+        years = data['year']
+        year_isnull = data['year_isnull']
+        in_matrix = data['emb_in_matrix']
+        texts = {field: (data[field].tobytes(), data[f'{field}_offsets']) for field in TEXT_FIELDS}
+        extra = (data['emb_extra'].tobytes(), data['emb_extra_offsets'])
+
+    def text(column, i):
+        blob, offsets = column
+        return blob[offsets[i]:offsets[i + 1]]
+
+    total = len(ids)
+    with transaction.atomic(), zipfile.ZipFile(path) as archive, archive.open('embeddings.npy') as fp:
+        shape, dtype = _read_header(fp)
+        if shape[0] != total:
+            raise ValueError(f"Corrupt snapshot: {shape[0]} embeddings for {total} movies")
+        row_bytes = int(np.prod(shape[1:])) * dtype.itemsize
+
+        if replace:
+            _delete_catalog()
+        elif Movie.objects.exists():
+            raise ValueError("The Movie table is not empty; import with replace to overwrite it")
+
+        for start in range(0, total, chunk_size):
+            stop = min(total, start + chunk_size)
+            with instrumentation.span('snapshot.read'):
+                matrix = fp.read((stop - start) * row_bytes)
+            movies = []
+            for i in range(start, stop):
+                if in_matrix[i]:
+                    offset = (i - start) * row_bytes
+                    emb = matrix[offset:offset + row_bytes]
+                else:
+                    emb = text(extra, i)
+                movies.append(Movie(
+                    pk=int(ids[i]),
+                    year=None if year_isnull[i] else int(years[i]),
+                    emb=emb,
+                    **{field: text(texts[field], i).decode('utf-8') for field in TEXT_FIELDS},
+                ))
+            with instrumentation.span('db.bulk_create'):
+                Movie.objects.bulk_create(movies)
+            with instrumentation.span('db.genres'):
+                sync_genres(movies)
+
+        embeddings_changed()
+    return total
+
+
+def _delete_catalog():
+    # DELETE directo: Movie.objects.all().delete() cargaría cada película y
+    # dispararía post_delete (una subida de generación) por fila
+    MovieGenre.objects.all().delete()
+    Job.objects.all().delete()
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {connection.ops.quote_name(Movie._meta.db_table)}')
+
+
+def _pack(values):
+    """Lista de bytes -> (blob uint8, offsets int64 de longitud N + 1)."""
+    offsets = np.zeros(len(values) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in values], out=offsets[1:])
+    return np.frombuffer(b''.join(values), dtype=np.uint8), offsets
+
+
+def _write_header(fp, dtype, shape):
+    header = {'descr': np.lib.format.dtype_to_descr(np.dtype(dtype)), 'fortran_order': False, 'shape': shape}
+    np.lib.format.write_array_header_1_0(fp, header)
+
+
+def _read_header(fp):
+    version = np.lib.format.read_magic(fp)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(fp)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(fp)
+    if fortran_order or len(shape) != 2:
+        raise ValueError("Corrupt snapshot: embeddings must be a C-ordered 2-D array")
+    return shape, dtype
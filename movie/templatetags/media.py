@@ -0,0 +1,22 @@
+from django import template
+from django.conf import settings
+from django.utils.encoding import filepath_to_uri
+
+from movie import media
+
+register = template.Library()
+
+
+@register.filter
+def media_url(file):
+    """
+    URL de un archivo de MEDIA_ROOT con el hash del contenido en el nombre,
+    para que el navegador lo guarde en caché sin volver a pedirlo.
+    """
+    name = getattr(file, 'name', file)
+    if not name:
+        return ''
+    if settings.MEDIA_SERVING != 'static':
+        name = media.hashed_name(name)
+    # Igual que FieldFile.url: los pósters se llaman m_<título>.png ("?", "#", espacios...)
+    return settings.MEDIA_URL + filepath_to_uri(name)
@@ -1,3 +1,377 @@
-from django.test import TestCase
+import base64
+import csv
+import datetime
+import io
+import json
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+import numpy as np
+
+from django.core.management import call_command
+from django.http import Http404
+from django.template import Context, Template
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from django.utils.encoding import filepath_to_uri
+
+from . import ai, dedup, jobs, media, scoring
+
+from .api import ApiError, decode_cursor, encode_cursor, keyset_filter
+from .models import IndexGeneration, Job, Movie
+from .templatetags.cards import fragment_cache
+from news.models import News
 
 # Create your tests here.
+
+
+class KeysetCursorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.movies = [Movie.objects.create(title=f"Movie {i}", description="-", year=2000 + i) for i in range(5)]
+        day = datetime.date(2024, 1, 1)
+        cls.news = [News.objects.create(headline=f"News {i}", body="-", date=day + datetime.timedelta(days=i // 2))
+                    for i in range(5)]
+
+    def test_cursor_round_trip(self):
+        values = ['2024-01-02', 17, 'ñandú']
+        self.assertEqual(decode_cursor(encode_cursor(values)), values)
+
+    def test_decode_rejects_garbage(self):
+        for cursor in ('zzz', encode_cursor({'id': 1}), 'bm90IGpzb24'):
+            with self.subTest(cursor=cursor), self.assertRaises(ApiError):
+                decode_cursor(cursor)
+
+    def test_ascending_filter_starts_after_value(self):
+        pivot = self.movies[1].pk
+        rows = Movie.objects.filter(keyset_filter(('id',), [pivot], Movie)).order_by('id')
+        self.assertEqual(list(rows.values_list('pk', flat=True)), [movie.pk for movie in self.movies[2:]])
+
+    def test_descending_composite_filter_breaks_ties_on_id(self):
+        ordered = list(News.objects.order_by('-date', '-id'))
+        pivot = ordered[1]
+        rows = News.objects.filter(keyset_filter(('-date', '-id'), [pivot.date.isoformat(), pivot.pk], News))
+        self.assertEqual(list(rows.order_by('-date', '-id')), ordered[2:])
+
+    def test_wrong_length_or_type_is_400(self):
+        for ordering, values, model in (
+            (('id',), [], Movie),
+            (('id',), ['abc'], Movie),
+            (('id',), [None], Movie),
+            (('id',), [[1]], Movie),
+            (('-date', '-id'), ['not a date', 1], News),
+        ):
+            with self.subTest(values=values), self.assertRaises(ApiError):
+                keyset_filter(ordering, values, model)
+
+    def test_pages_cover_catalog_once(self):
+        seen, cursor = [], None
+        while True:
+            response = self.client.get('/api/movies/', {'limit': 2, 'fields': 'id', **({'cursor': cursor} if cursor else {})})
+            page = self._json(response)
+            seen += [row['id'] for row in page['results']]
+            cursor = page['next']
+            if cursor is None:
+                break
+        self.assertEqual(seen, [movie.pk for movie in self.movies])
+
+    def test_bad_query_parameters_are_400(self):
+        for params in ({'year': 'abc'}, {'limit': '-1'}, {'cursor': encode_cursor(['abc'])}, {'fields': 'emb'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get('/api/movies/', params).status_code, 400)
+
+    def _json(self, response):
+        self.assertEqual(response.status_code, 200)
+        return json.loads(b''.join(response.streaming_content))
+
+    def test_float16_embeddings_are_null_for_default_rows(self):
+        real = np.linspace(-1, 1, ai.EMBEDDING_DIM, dtype=np.float32)
+        Movie.objects.filter(pk=self.movies[0].pk).update(emb=real.tobytes())
+        page = self._json(self.client.get('/api/movies/', {'fields': 'id', 'embeddings': 'float16'}))
+        embs = {row['id']: row['emb'] for row in page['results']}
+        decoded = np.frombuffer(base64.b64decode(embs.pop(self.movies[0].pk)), dtype=np.float16)
+        np.testing.assert_allclose(decoded, real, atol=1e-3)
+        self.assertEqual(set(embs.values()), {None})
+
+        detail = self.client.get(f'/api/movies/{self.movies[1].pk}/', {'embeddings': 'float16'})
+        self.assertIsNone(json.loads(detail.content)['emb'])
+
+
+class TitleDedupTests(TestCase):
+    def test_sequel_from_another_year_is_not_a_duplicate(self):
+        titles = dedup.TitleIndex([1, 2], ['Rocky II', 'The Matrix'], [1979, 1999])
+        self.assertEqual([movie_id for movie_id, _ in titles.similar('Rocky III')], [1])  # parecido sin año
+        self.assertEqual(titles.similar('Rocky III', year=1982), [])
+
+    def test_respelled_title_from_the_same_year_is_a_duplicate(self):
+        titles = dedup.TitleIndex([1, 2], ['Rocky II', 'The Matrix'], [1979, 1999])
+        self.assertEqual(titles.similar('Matrix, The', year=1999), [(2, 1.0)])
+        titles.add(3, 'Amélie', 2001)
+        self.assertEqual(titles.similar('Amelie', year=2001), [(3, 1.0)])
+        self.assertEqual(titles.similar('Amelie', year=2022), [])
+
+    def test_csv_update_does_not_write_to_a_fuzzy_match(self):
+        movie = Movie.objects.create(title='The Matrix', description='old', year=1999)
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, 'updated_movie_descriptions.csv'), 'w', encoding='utf-8', newline='') as file:
+                writer = csv.writer(file)
+                writer.writerow(['Title', 'Updated Description'])
+                writer.writerow(['Matrix, The', 'new'])
+            os.chdir(directory)
+            try:
+                stderr = io.StringIO()
+                call_command('update_movies_from_csv', stdout=io.StringIO(), stderr=stderr)
+            finally:
+                os.chdir(cwd)
+        movie.refresh_from_db()
+        self.assertEqual(movie.description, 'old')
+        self.assertIn(f"closest title is {movie.pk} 'The Matrix'", stderr.getvalue())
+
+
+def fake_embeddings(texts):
+    return [np.full(ai.EMBEDDING_DIM, len(text), dtype=np.float32) for text in texts]
+
+
+@mock.patch.object(ai, 'get_embeddings', side_effect=fake_embeddings)
+class JobQueueTests(TestCase):
+    def claim(self):
+        return jobs.claim_batch('test-worker', batch_size=10, kinds=[Job.EMBEDDING])
+
+    def test_empty_description_fails_alone(self, get_embeddings):
+        movies = [Movie.objects.create(title=f"Movie {i}", description=description)
+                  for i, description in enumerate(['one', '  ', 'three'])]
+        for movie in movies:
+            jobs.enqueue(movie.pk, Job.EMBEDDING)
+
+        self.assertEqual(jobs.run_batch(self.claim()), (2, 1))
+        get_embeddings.assert_called_once_with(['one', 'three'])
+        statuses = dict(Job.objects.values_list('movie_id', 'status'))
+        self.assertEqual(statuses, {movies[0].pk: Job.DONE, movies[1].pk: Job.PENDING, movies[2].pk: Job.DONE})
+        emb = np.frombuffer(Movie.objects.get(pk=movies[2].pk).emb, dtype=np.float32)
+        self.assertEqual(emb.shape, (ai.EMBEDDING_DIM,))
+        self.assertTrue((emb == len('three')).all())
+
+    def test_failed_job_is_retried_later(self, get_embeddings):
+        get_embeddings.side_effect = RuntimeError("API down")
+        movie = Movie.objects.create(title="Movie", description="plot")
+        jobs.enqueue(movie.pk, Job.EMBEDDING)
+        before = timezone.now()
+
+        self.assertEqual(jobs.run_batch(self.claim()), (0, 1))
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts, job.locked_by), (Job.PENDING, 1, ''))
+        self.assertIn("API down", job.last_error)
+        self.assertGreaterEqual(job.run_after, before + datetime.timedelta(seconds=jobs.RETRY_BASE_DELAY))
+        self.assertEqual(self.claim(), [])  # todavía no toca
+
+    def test_job_fails_after_max_attempts(self, get_embeddings):
+        get_embeddings.side_effect = RuntimeError("API down")
+        movie = Movie.objects.create(title="Movie", description="plot")
+        job = jobs.enqueue(movie.pk, Job.EMBEDDING)
+        for _ in range(job.max_attempts):
+            Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+            self.assertEqual(jobs.run_batch(self.claim()), (0, 1))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, job.max_attempts))
+        self.assertEqual(self.claim(), [])
+
+    def test_enqueue_twice_creates_one_job(self, get_embeddings):
+        movie = Movie.objects.create(title="Movie", description="plot")
+        first = jobs.enqueue(movie.pk, Job.EMBEDDING)
+        second = jobs.enqueue(movie.pk, Job.EMBEDDING, priority=first.priority + 5)
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(Job.objects.filter(movie=movie, kind=Job.EMBEDDING).count(), 1)
+        self.assertEqual(Job.objects.get().priority, first.priority + 5)
+
+
+class ScoringEngineTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.settings_override = override_settings(SCORING_INDEX_DIR=self.directory)
+        self.settings_override.enable()
+        scoring.invalidate()
+
+    def tearDown(self):
+        scoring.invalidate()
+        self.settings_override.disable()
+        shutil.rmtree(self.directory)
+
+    def test_default_embeddings_on_lowest_ids_are_skipped(self):
+        # Más filas con el valor por defecto que con embeddings reales, y la primera de ellas
+        defaults = [Movie.objects.create(title=f"No embedding {i}", description="-") for i in range(4)]
+        self.assertNotEqual(len(defaults[0].emb), ai.EMBEDDING_DIM * 4)
+        vectors = np.eye(3, ai.EMBEDDING_DIM, dtype=np.float32)
+        movies = [Movie.objects.create(title=f"Movie {i}", description="-", emb=vector.tobytes())
+                  for i, vector in enumerate(vectors)]
+
+        engine = scoring.get_engine()
+        results = engine.top_k(vectors[1], k=5)
+        self.assertEqual(sorted(movie_id for movie_id, _ in results), [movie.pk for movie in movies])
+        self.assertEqual(results[0][0], movies[1].pk)
+        self.assertAlmostEqual(results[0][1], 1.0, places=5)
+
+
+class IndexGenerationTests(TestCase):
+    def test_bump_creates_and_increments(self):
+        self.assertEqual(IndexGeneration.current('test'), 0)
+        IndexGeneration.bump('test')
+        IndexGeneration.bump('test')
+        self.assertEqual(IndexGeneration.current('test'), 2)
+
+    def test_bump_counts_when_another_process_created_the_row(self):
+        # Simula la carrera: el update no encuentra la fila, pero otro proceso la crea antes del get_or_create
+        IndexGeneration.objects.create(name='test', value=5)
+        real_filter = IndexGeneration.objects.filter
+        calls = []
+
+        def racing_filter(**kwargs):
+            calls.append(kwargs)
+            if len(calls) == 1:
+                return IndexGeneration.objects.none()
+            return real_filter(**kwargs)
+
+        with mock.patch.object(IndexGeneration.objects, 'filter', side_effect=racing_filter):
+            IndexGeneration.bump('test')
+        self.assertEqual(IndexGeneration.current('test'), 6)
+
+
+class RangeAndETagTests(SimpleTestCase):
+    def test_parse_range(self):
+        cases = [
+            (None, None),
+            ('', None),
+            ('bytes=0-99', (0, 99)),
+            ('bytes=100-', (100, 999)),
+            ('bytes=-100', (900, 999)),
+            ('bytes=-5000', (0, 999)),
+            ('bytes=990-5000', (990, 999)),
+            ('bytes=0-0', (0, 0)),
+            ('bytes=0-1,5-6', None),  # varios rangos: archivo entero
+            ('items=0-1', None),
+            ('bytes=-', None),
+        ]
+        for header, expected in cases:
+            with self.subTest(header=header):
+                self.assertEqual(media.parse_range(header, 1000), expected)
+
+    def test_unsatisfiable_ranges(self):
+        for header in ('bytes=1000-', 'bytes=1000-2000', 'bytes=50-10', 'bytes=-0'):
+            with self.subTest(header=header), self.assertRaises(ValueError):
+                media.parse_range(header, 1000)
+
+    def test_etag_matches(self):
+        self.assertTrue(media._etag_matches('"abc"', '"abc"'))
+        self.assertTrue(media._etag_matches('"x", "abc"', '"abc"'))
+        self.assertTrue(media._etag_matches('W/"abc"', '"abc"'))  # comparación débil
+        self.assertTrue(media._etag_matches('"abc"', 'W/"abc"'))
+        self.assertTrue(media._etag_matches('*', '"abc"'))
+        self.assertFalse(media._etag_matches('"abcd"', '"abc"'))
+        self.assertFalse(media._etag_matches('', '"abc"'))
+        self.assertFalse(media._etag_matches(None, '"abc"'))
+
+
+class ServeMediaTests(SimpleTestCase):
+    def setUp(self):
+        self.base = tempfile.mkdtemp()
+        self.root = os.path.join(self.base, 'media')
+        os.makedirs(os.path.join(self.root, 'movie', 'images'))
+        self.content = bytes(range(256)) * 4
+        with open(os.path.join(self.root, 'movie', 'images', 'm_What Is It?.png'), 'wb') as file:
+            file.write(self.content)
+        with open(os.path.join(self.base, 'secret.txt'), 'w') as file:
+            file.write('secret')
+        self.settings_override = override_settings(
+            MEDIA_ROOT=self.root, MEDIA_SERVING='app',
+            MEDIA_MANIFEST=os.path.join(self.base, 'media-manifest.json.gz'),
+        )
+        self.settings_override.enable()
+        media._manifest = None
+        self.factory = RequestFactory()
+
+    def tearDown(self):
+        media._manifest = None
+        self.settings_override.disable()
+        shutil.rmtree(self.base)
+
+    def serve(self, path, **headers):
+        return media.serve(self.factory.get('/media/' + path, headers=headers), path)
+
+    def test_full_response_and_conditional_get(self):
+        response = self.serve('movie/images/m_What Is It?.png')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        not_modified = self.serve('movie/images/m_What Is It?.png', **{'If-None-Match': response['ETag']})
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_range(self):
+        response = self.serve('movie/images/m_What Is It?.png', Range='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(self.content)}')
+        self.assertEqual(b''.join(response.streaming_content), self.content[10:20])
+
+    def test_range_ignored_when_if_range_does_not_match(self):
+        response = self.serve('movie/images/m_What Is It?.png', Range='bytes=10-19', **{'If-Range': '"old"'})
+        self.assertEqual(response.status_code, 200)
+        response.close()
+
+    def test_unsatisfiable_range_is_416(self):
+        response = self.serve('movie/images/m_What Is It?.png', Range=f'bytes={len(self.content)}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.content)}')
+
+    def test_hashed_name_is_immutable(self):
+        name = 'movie/images/m_What Is It?.png'
+        media.write_manifest(media.build_manifest(self.root))
+        media._manifest = None
+        response = self.serve(media.hashed_name(name))
+        self.assertIn('immutable', response['Cache-Control'])
+        response.close()
+        stale = self.serve('movie/images/m_What Is It?.000000000000.png')
+        self.assertNotIn('immutable', stale['Cache-Control'])
+        stale.close()
+
+    def test_traversal_and_missing_files_are_404(self):
+        for path in ('../secret.txt', 'movie/../../secret.txt', '/etc/passwd', 'movie/images/nope.png'):
+            with self.subTest(path=path), self.assertRaises(Http404):
+                self.serve(path)
+
+    def test_x_accel_redirect_only_sends_headers(self):
+        with override_settings(MEDIA_SERVING='x-accel-redirect', MEDIA_ACCEL_PREFIX='/protected/'):
+            response = self.serve('movie/images/m_What Is It?.png')
+        self.assertEqual(response['X-Accel-Redirect'], '/protected/movie/images/m_What%20Is%20It%3F.png')
+        self.assertEqual(response.content, b'')
+
+    def test_cached_cards_follow_media_serving_and_manifest(self):
+        movie = Movie(pk=10 ** 6, title='What Is It?', image='movie/images/m_What Is It?.png',
+                      updated_at=datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc))
+        cards = Template('{% load cards %}{% cached_cards movies "movie_card.html" "movie" %}')
+
+        def render():
+            return cards.render(Context({'movies': [movie]}))
+
+        fragment_cache().clear()
+
+        with override_settings(MEDIA_SERVING='static'):
+            self.assertIn('/m_What%20Is%20It%3F.png"', render())
+        self.assertIn('/m_What%20Is%20It%3F.png"', render())  # 'app' sin manifiesto: sin hash
+
+        media.write_manifest(media.build_manifest(self.root))
+        media._manifest = None
+        hashed = media.hashed_name('movie/images/m_What Is It?.png')
+        self.assertNotEqual(hashed, 'movie/images/m_What Is It?.png')
+        self.assertIn(filepath_to_uri(hashed), render())
+
+    def test_x_sendfile_path_is_ascii(self):
+        name = 'movie/images/m_千と千尋 Amélie.png'
+        with open(os.path.join(self.root, name), 'wb') as file:
+            file.write(b'png')
+        with override_settings(MEDIA_SERVING='x-sendfile'):
+            response = self.serve(name)
+        header = response['X-Sendfile']
+        header.encode('ascii')
+        self.assertNotIn('=?utf-8?', header)
+        self.assertTrue(header.endswith('/m_%E5%8D%83%E3%81%A8%E5%8D%83%E5%B0%8B%20Am%C3%A9lie.png'))
@@ -1,19 +1,22 @@
-import matplotlib.pyplot as plt
-import matplotlib
 import io
 import urllib, base64
-from django.shortcuts import render
-from django.http import HttpResponse
-from .models import Movie
-import numpy as np
-import os
-from openai import OpenAI
-from dotenv import load_dotenv
+from django.core.paginator import Paginator
+from django.shortcuts import get_object_or_404, render
+from django.http import HttpResponse, JsonResponse, Http404
+from django.db.models import Count
+from .models import Cluster, Movie, Genre, IndexGeneration
+from . import ai, instrumentation
 from django.conf import settings
 
+# matplotlib, numpy (vía movie.scoring) y el SDK de OpenAI se importan dentro
+# de las vistas que los usan: cargar este módulo (urls, `manage.py check`,
+# cada worker) no los trae.
+
 # --- Función para calcular la similitud de coseno ---
 def cosine_similarity(a, b):
     """Calcula la similitud de coseno entre dos vectores a y b."""
+    import numpy as np
+
     # Asegurarse de que los vectores no sean nulos para evitar división por cero
     norm_a = np.linalg.norm(a)
     norm_b = np.linalg.norm(b)
@@ -24,55 +27,99 @@ def cosine_similarity(a, b):
 # --- Función para generar el embedding de un texto ---
 def get_embedding(text):
     """Genera un embedding para el texto dado usando la API de OpenAI."""
-    # Carga las variables de entorno (tu API key). Intenta usar BASE_DIR/.env
-    try:
-        load_dotenv(os.path.join(settings.BASE_DIR, ".env"))
-    except Exception:
-        # Fallback a carga por defecto si settings no está disponible
-        load_dotenv()
-
-    load_dotenv()
-    client = OpenAI(api_key=os.environ.get('openai_apikey'))
-    
-    response = client.embeddings.create(
-        input=[text],
-        model="text-embedding-3-small" # Mismo modelo usado para las películas
-    )
-    return np.array(response.data[0].embedding, dtype=np.float32)
+    return ai.get_embedding(text)
 
 # --- La vista principal para la página de recomendación ---
+def get_recommendations(prompt, genre=''):
+    """
+    [(movie_id, similitud)] de las RECOMMENDATION_CACHE_K películas más
+    parecidas al prompt, desde la caché si ya se calcularon para esta
+    generación del índice.
+    """
+    import numpy as np
+
+    from . import result_cache, scoring
+
+    # 1. Buscar el resultado en caché (válido mientras no cambien los embeddings;
+    #    los aproximados, además, mientras no cambien los grupos ni RECOMMEND_CLUSTER_PROBES)
+    generation = IndexGeneration.current()
+    probes = settings.RECOMMEND_CLUSTER_PROBES
+    variants = [result_cache.EXACT]
+    if probes > 0:
+        clusters_generation = IndexGeneration.current(IndexGeneration.CLUSTERS)
+        variants.append(result_cache.cluster_variant(clusters_generation, probes))
+    results = result_cache.get_results(generation, prompt, genre, variants=variants)
+    instrumentation.incr('cache.hit' if results is not None else 'cache.miss')
+    if results is not None:
+        return results
+
+    # 2. Generar el embedding del prompt del usuario
+    with instrumentation.span('embedding'):
+        prompt_emb = get_embedding(prompt)
+
+    # 3. Restringir candidatos por género (solo ids, sin embeddings)
+    candidate_ids = None
+    if genre:
+        with instrumentation.span('db'):
+            candidate_ids = list(Movie.objects.filter(genres__slug=genre).values_list('id', flat=True))
+
+    # 4. Opcional: solo las películas de los grupos más cercanos al prompt
+    k = settings.RECOMMENDATION_CACHE_K
+    cluster_ids = None
+    if probes > 0:
+        from . import clustering
+
+        cluster_set = clustering.get_cluster_set(generation, clusters_generation)
+        if cluster_set is not None:
+            cluster_ids = cluster_set.candidate_ids(prompt_emb, probes)
+            if candidate_ids is not None:
+                cluster_ids = np.intersect1d(cluster_ids, candidate_ids)
+
+    # 5. Puntuar todas las películas a la vez con el motor de similitud
+    with instrumentation.span('scoring'):
+        engine = scoring.get_engine(generation)
+        results = None
+        variant = result_cache.EXACT
+        if cluster_ids is not None:
+            results = engine.top_k(prompt_emb, k=k, candidate_ids=cluster_ids)
+            instrumentation.incr('clusters.hit' if len(results) == k else 'clusters.fallback')
+            variant = variants[-1]
+        if results is None or len(results) < k:
+            # Grupos demasiado pequeños para llenar k: búsqueda exacta
+            results = engine.top_k(prompt_emb, k=k, candidate_ids=candidate_ids)
+            variant = result_cache.EXACT
+    result_cache.set_results(generation, prompt, results, genre, variant=variant)
+    return results
+
+
 def recommend_movie(request):
-    context = {} # El diccionario que pasaremos al template
+    context = {'genres': Genre.objects.all()} # El diccionario que pasaremos al template
 
     if request.method == 'POST':
         prompt = request.POST.get('prompt', '')
+        genre = request.POST.get('genre', '')
+        context['selected_genre'] = genre
         
         if prompt:
-            # 1. Generar el embedding del prompt del usuario
-            prompt_emb = get_embedding(prompt)
+            from . import result_cache
 
-            # 2. Recorrer la BD y comparar
+            result_cache.log_prompt(prompt, genre)
             best_movie = None
             max_similarity = -1  # Usamos -1 porque la similitud de coseno va de -1 a 1
 
-            for movie in Movie.objects.all():
-                # Convertir el embedding binario de la película a un array de numpy
-                movie_emb = np.frombuffer(movie.emb, dtype=np.float32)
-                
-                # Calcular la similitud
-                similarity = cosine_similarity(prompt_emb, movie_emb)
-
-                # Actualizar si encontramos una película más similar
-                if similarity > max_similarity:
-                    max_similarity = similarity
-                    best_movie = movie
-            
-            # 3. Preparar el contexto para mostrar el resultado
+            results = get_recommendations(prompt, genre)
+            if results:
+                best_id, max_similarity = results[0]
+                with instrumentation.span('db'):
+                    best_movie = Movie.objects.filter(pk=best_id).first()
+
+            # 6. Preparar el contexto para mostrar el resultado
             context['recommended_movie'] = best_movie
             context['similarity_score'] = max_similarity
             context['user_prompt'] = prompt
 
-    return render(request, 'recommend.html', context)
+    with instrumentation.span('render'):
+        return render(request, 'recommend.html', context)
 
 # Create your views here.
 
@@ -81,25 +128,71 @@ def about(request):
     return render(request, 'about.html')  # Render the home.html template
 
 
+def genre_facets(movies=None):
+    """Géneros con su número de películas (un solo GROUP BY), opcionalmente dentro del queryset ``movies``."""
+    genres = Genre.objects.all()
+    if movies is not None:
+        genres = genres.filter(movie_genres__movie__in=movies.values('id'))
+    return (genres
+            .annotate(count=Count('movie_genres'))
+            .filter(count__gt=0)
+            .order_by('-count', 'name'))
+
+
+# Columnas que usa movie_card.html: sin emb (~12 KB por fila) ni el resto
+CARD_FIELDS = ('title', 'description', 'image', 'url', 'genre', 'year', 'updated_at')
+
+
 def home(request):
     #return HttpResponse("<h1>Welcome to the Movie Reviews Home Page!</h1>")
     #return render(request, 'home.html')  # Render the home.html template
     searchTerm = request.GET.get('searchMovie')
     if searchTerm:
         movies = Movie.objects.filter(title__icontains=searchTerm)  # Filter movies based on search term
+        facets = genre_facets(movies)
     else:
         movies = Movie.objects.all()
-    return render(request, 'home.html', {'searchTerm': searchTerm, 'movies': movies})  # Render the home.html template with a title context and movie list
+        facets = genre_facets()
+    selectedGenre = request.GET.get('genre')
+    if selectedGenre:
+        movies = movies.filter(genres__slug=selectedGenre)
+    movies = movies.only(*CARD_FIELDS)
+    with instrumentation.span('render'):
+        return render(request, 'home.html', {
+            'searchTerm': searchTerm,
+            'movies': movies,
+            'genres': facets,
+            'selectedGenre': selectedGenre,
+        })  # Render the home.html template with a title context and movie list
+
+def browse(request):
+    """Grupos temáticos (manage.py cluster_movies) con sus películas más representativas."""
+    clusters = list(Cluster.objects.all())
+    ids = [movie_id for cluster in clusters for movie_id in cluster.representative_ids]
+    with instrumentation.span('db'):
+        movies = Movie.objects.only('id', 'title', 'image', 'year').in_bulk(ids)
+    for cluster in clusters:
+        cluster.representatives = [movies[movie_id] for movie_id in cluster.representative_ids if movie_id in movies]
+    with instrumentation.span('render'):
+        return render(request, 'browse.html', {'clusters': clusters})
+
+
+def cluster_detail(request, pk):
+    cluster = get_object_or_404(Cluster, pk=pk)
+    page = Paginator(cluster.movies.only(*CARD_FIELDS).order_by('title', 'id'), settings.BROWSE_PAGE_SIZE).get_page(request.GET.get('page'))
+    with instrumentation.span('render'):
+        return render(request, 'cluster.html', {'cluster': cluster, 'page': page})
 
 def statistics_view(request):
+    import matplotlib
     matplotlib.use('Agg')
-    all_movies = Movie.objects.all()
+    import matplotlib.pyplot as plt
 
     # ---------------- Gráfica por año ----------------
-    movie_counts_by_year = {}
-    for movie in all_movies:
-        year = movie.year if movie.year else "None"
-        movie_counts_by_year[year] = movie_counts_by_year.get(year, 0) + 1
+    # Un solo GROUP BY en la BD en lugar de recorrer todas las películas
+    with instrumentation.span('db'):
+        year_rows = Movie.objects.values('year').annotate(count=Count('id')).order_by('year')
+        movie_counts_by_year = {row['year'] or "None": row['count'] for row in year_rows}
 
     plt.bar(range(len(movie_counts_by_year)), movie_counts_by_year.values())
     plt.title('Movies per year')
@@ -113,24 +206,15 @@ def statistics_view(request):
     graphic_year = base64.b64encode(buffer.getvalue()).decode('utf-8')
     buffer.close()
 
-    # ---------------- Gráfica por género (primer género) ----------------
-    from collections import Counter
-    import re
-    counts = Counter()
-    for m in all_movies:
-        raw = (m.genre or "").strip()
-        if not raw:   # si el campo está vacío o NULL, la ignora
-            continue
-        first_genre = re.split(r'[,/|;]', raw)[0].strip()
-        counts[first_genre] += 1
-
+    # ---------------- Gráfica por género (todos los géneros) ----------------
+    with instrumentation.span('db'):
+        genre_counts = list(genre_facets())
 
-    genres = list(counts.keys())   # tal cual están, sin ordenar
-    values = list(counts.values())
+    genres = [genre.name for genre in genre_counts]
+    values = [genre.count for genre in genre_counts]
 
-    
     plt.bar(range(len(genres)), values, color="green")
-    plt.title('Movies per genre (first only)')
+    plt.title('Movies per genre')
     plt.xlabel('Genre')
     plt.ylabel('Number of movies')
     
@@ -148,10 +232,20 @@ def statistics_view(request):
     buffer.close()
 
     # Enviar ambas al template
-    return render(request, 'statistics.html', {
-        'graphic_year': graphic_year,
-        'graphic_genre': graphic_genre,})
+    with instrumentation.span('render'):
+        return render(request, 'statistics.html', {
+            'graphic_year': graphic_year,
+            'graphic_genre': graphic_genre,})
 
 def signup(request):
     email = request.GET.get('email')
     return render(request, 'signup.html', {'email': email})  # Render the signup.html template with the email context   
+
+
+def metrics(request):
+    """Histogramas agregados de la instrumentación (solo staff o DEBUG)."""
+    if not getattr(settings, 'MOVIE_INSTRUMENTATION', False):
+        raise Http404("Instrumentation is disabled")
+    if not (settings.DEBUG or request.user.is_staff):
+        return JsonResponse({'detail': 'Forbidden'}, status=403)
+    return JsonResponse(instrumentation.registry.snapshot())
@@ -0,0 +1,2 @@
+# Registra los PRAGMA de SQLite (señal connection_created) antes de abrir conexiones
+from . import database  # noqa: F401
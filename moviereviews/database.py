@@ -0,0 +1,53 @@
+"""
+Capa de configuración de la base de datos.
+
+- ``configure_sqlite``: aplica los PRAGMA definidos en la clave ``PRAGMAS``
+  de cada entrada de DATABASES cada vez que se abre una conexión SQLite
+  (WAL, synchronous, mmap_size, cache_size...).
+- ``ReadReplicaRouter``: envía las lecturas a la conexión de solo lectura
+  ``replica`` y las escrituras/migraciones a ``default``.
+"""
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+REPLICA_ALIAS = 'replica'
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = connection.settings_dict.get('PRAGMAS') or {}
+    if not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+class ReadReplicaRouter:
+    """
+    Lecturas a ``replica`` (conexión SQLite ``mode=ro`` sobre el mismo archivo).
+
+    Con WAL, los lectores ven siempre el último commit sin bloquear a los
+    escritores. Dentro de un ``transaction.atomic()`` sobre ``default`` las
+    lecturas se quedan en ``default`` para ver los cambios aún no confirmados.
+    """
+
+    def db_for_read(self, model, **hints):
+        if REPLICA_ALIAS not in connections.settings:
+            return None
+        if connections['default'].in_atomic_block:
+            return 'default'
+        return REPLICA_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Ambos alias apuntan al mismo archivo
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
@@ -12,12 +12,29 @@ https://docs.djangoproject.com/en/3.2/ref/settings/
 import os
 from pathlib import Path
 
+import django
+from dotenv import load_dotenv
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Variables de entorno (openai_apikey, ...) desde BASE_DIR/.env, una sola vez al arrancar
+load_dotenv(BASE_DIR / '.env')
+
 MEDIA_ROOT = BASE_DIR / 'media'
 MEDIA_URL = '/media/'
 
+# Cómo se sirve MEDIA_ROOT (movie/media.py):
+#   'static'           -> django.conf.urls.static (solo con DEBUG, desarrollo)
+#   'app'              -> vista propia con manifiesto, ETag/304, Range y Cache-Control
+#   'x-sendfile'       -> igual, pero el archivo lo envía Apache/lighttpd (X-Sendfile)
+#   'x-accel-redirect' -> igual, pero lo envía nginx desde MEDIA_ACCEL_PREFIX (location internal)
+MEDIA_SERVING = os.environ.get('MEDIA_SERVING', 'static')
+MEDIA_ACCEL_PREFIX = os.environ.get('MEDIA_ACCEL_PREFIX', '/protected-media/')
+MEDIA_MANIFEST = BASE_DIR / 'media-manifest.json.gz'  # `manage.py build_media_manifest`
+MEDIA_MANIFEST_CHECK_INTERVAL = 30  # segundos entre comprobaciones de si el manifiesto cambió
+MEDIA_MAX_AGE = 3600  # Cache-Control de las URLs sin hash (se revalidan con ETag)
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/3.2/howto/deployment/checklist/
@@ -45,23 +62,55 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'movie.middleware.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'movie.middleware.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Instrumentación de rutas calientes (Server-Timing + /metrics/).
+# Desactivada por defecto: el middleware se descarta al arrancar.
+MOVIE_INSTRUMENTATION = os.environ.get('MOVIE_INSTRUMENTATION', '0') == '1'
+
+# Motor de recomendación (movie/scoring.py): índice de embeddings mapeado en
+# disco, partido en shards que se puntúan en paralelo en un pool persistente.
+SCORING_INDEX_DIR = os.environ.get('SCORING_INDEX_DIR', os.path.join(BASE_DIR, 'index'))
+SCORING_WORKERS = int(os.environ.get('SCORING_WORKERS', min(4, os.cpu_count() or 1)))
+SCORING_SHARDS = int(os.environ.get('SCORING_SHARDS', SCORING_WORKERS))
+SCORING_EXECUTOR = os.environ.get('SCORING_EXECUTOR', 'thread')  # 'thread' o 'process'
+SCORING_MIN_SHARD_ROWS = 8192  # por debajo no vale la pena repartir entre workers
+
+# Cola de trabajos en la BD (movie/jobs.py, `manage.py run_jobs`): al cambiar el
+# título o la descripción de una película se encolan embedding, descripción y póster.
+MOVIE_JOBS_AUTO_ENQUEUE = os.environ.get('MOVIE_JOBS_AUTO_ENQUEUE', '1') == '1'
+
+# Perfilado de peticiones para staff (?profile=cprofile|sample o cabecera X-Profile)
+# y destino de los perfiles de `manage.py <comando> --profile`.
+MOVIE_PROFILING = os.environ.get('MOVIE_PROFILING', '0') == '1'
+PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(BASE_DIR, 'profiles'))
+PROFILE_SAMPLE_INTERVAL = 0.005  # segundos entre muestras del modo 'sample'
+
 ROOT_URLCONF = 'moviereviews.urls'
 
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'moviereviews/templates')],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Plantillas compiladas una vez por proceso (también con DEBUG, como
+            # Django >= 4.1 por defecto; reiniciar el servidor si se editan en
+            # producción). Reemplaza APP_DIRS.
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -78,13 +127,139 @@ WSGI_APPLICATION = 'moviereviews.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
+# PRAGMA aplicados a cada conexión SQLite nueva (ver moviereviews/database.py).
+# WAL permite que las lecturas no se bloqueen mientras los comandos escriben.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',        # seguro con WAL, sin fsync en cada commit
+    'mmap_size': 256 * 1024 * 1024,  # 256 MB
+    'cache_size': -64000,           # en KiB (~64 MB por conexión)
+    'temp_store': 'MEMORY',
+}
+
+# Segundos que una conexión conserva abierta entre peticiones (0 = reconectar siempre)
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', '600'))
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'timeout': 20,  # busy timeout en segundos
+        },
+        'PRAGMAS': SQLITE_PRAGMAS,
     }
 }
 
+# Las transacciones de escritura toman el lock al empezar, así un lector que
+# pasa a escritor no recibe "database is locked" sin esperar el busy timeout.
+if django.VERSION >= (5, 1):
+    DATABASES['default']['OPTIONS']['transaction_mode'] = 'IMMEDIATE'
+
+# Réplica de lectura opcional: conexión de solo lectura al mismo archivo.
+# El router envía las lecturas allí y las escrituras a 'default'.
+DB_READ_REPLICA = os.environ.get('DB_READ_REPLICA', '0') == '1'
+if DB_READ_REPLICA:
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': f"file:{BASE_DIR / 'db.sqlite3'}?mode=ro",
+        'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'timeout': 20,
+        },
+        # journal_mode no se puede cambiar en modo solo lectura (WAL queda en el archivo)
+        'PRAGMAS': {
+            'query_only': 1,
+            'mmap_size': SQLITE_PRAGMAS['mmap_size'],
+            'cache_size': SQLITE_PRAGMAS['cache_size'],
+            'temp_store': SQLITE_PRAGMAS['temp_store'],
+        },
+        'TEST': {
+            'MIRROR': 'default',
+        },
+    }
+    DATABASE_ROUTERS = ['moviereviews.database.ReadReplicaRouter']
+
+
+# Caché de resultados de /recommend/ (movie/result_cache.py). Tamaño acotado,
+# TTL y desalojo LRU; para compartirla entre procesos (y con el comando
+# `warm_recommendations`) usar un backend compartido, p. ej.
+# RECOMMENDATION_CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'recommendations': {
+        'BACKEND': os.environ.get('RECOMMENDATION_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('RECOMMENDATION_CACHE_LOCATION', 'recommendations'),
+        'TIMEOUT': int(os.environ.get('RECOMMENDATION_CACHE_TIMEOUT', '3600')),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('RECOMMENDATION_CACHE_MAX_ENTRIES', '10000')),
+            'CULL_FREQUENCY': 20,  # al llenarse descarta 1/20 de las entradas menos usadas
+        },
+    },
+    # Fragmentos {% cache %} (una tarjeta por película/noticia y versión de la fila)
+    'template_fragments': {
+        'BACKEND': os.environ.get('TEMPLATE_FRAGMENT_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('TEMPLATE_FRAGMENT_CACHE_LOCATION', 'template_fragments'),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('TEMPLATE_FRAGMENT_CACHE_MAX_ENTRIES', '50000')),
+            'CULL_FREQUENCY': 20,
+        },
+    },
+}
+RECOMMENDATION_CACHE_K = 10  # resultados guardados por prompt
+
+# Grupos temáticos (manage.py cluster_movies): con RECOMMEND_CLUSTER_PROBES > 0,
+# /recommend/ solo puntúa las películas de los N grupos más cercanos al prompt.
+# 0 = búsqueda exacta sobre todo el catálogo.
+RECOMMEND_CLUSTER_PROBES = int(os.environ.get('RECOMMEND_CLUSTER_PROBES', '0'))
+BROWSE_PAGE_SIZE = 24
+
+# API JSON (movie/api.py): filas por página por defecto y filas leídas de la BD
+# por cada bloque del streaming.
+API_PAGE_SIZE = 100
+API_CHUNK_SIZE = 500
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'message',
+        },
+    },
+    'loggers': {
+        # Resumen de ?profile=1 (funciones más costosas), que es INFO
+        'movie.profiling': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
+# Log de prompts de /recommend/ (una línea JSON por consulta) para calentar la caché.
+RECOMMENDATION_PROMPT_LOG = os.environ.get('RECOMMENDATION_PROMPT_LOG', '')
+if RECOMMENDATION_PROMPT_LOG:
+    LOGGING['handlers']['prompts'] = {
+        'class': 'logging.FileHandler',
+        'filename': RECOMMENDATION_PROMPT_LOG,
+        'formatter': 'message',
+    }
+    LOGGING['loggers']['movie.prompts'] = {
+        'handlers': ['prompts'],
+        'level': 'INFO',
+        'propagate': False,
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
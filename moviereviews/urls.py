@@ -13,9 +13,14 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+import re
+
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from movie import views as movieViews
+from movie import api as movieApi
+from movie import media as movieMedia
+from news import api as newsApi
 
 from django.conf.urls.static import static
 from django.conf import settings
@@ -28,6 +33,20 @@ urlpatterns = [
     path('statistics/', movieViews.statistics_view, name='statistics'),  # Statistics view for the movie app
     path('signup/', movieViews.signup, name='signup'),  # Signup view for the movie app
     path('recommend/', movieViews.recommend_movie, name='recommend'),
+    path('browse/', movieViews.browse, name='browse'),  # Grupos temáticos (cluster_movies)
+    path('browse/<int:pk>/', movieViews.cluster_detail, name='cluster'),
+    path('metrics/', movieViews.metrics, name='metrics'),  # Métricas de instrumentación
+    # API JSON de solo lectura (movie/api.py)
+    path('api/movies/', movieApi.movie_list, name='api_movies'),
+    path('api/movies/<int:pk>/', movieApi.movie_detail, name='api_movie'),
+    path('api/recommend/', movieApi.recommend, name='api_recommend'),
+    path('api/news/', newsApi.news_list, name='api_news'),
 ]
 
-urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+if settings.MEDIA_SERVING == 'static':
+    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+else:
+    # Pósters con ETag, Range y caché larga (movie/media.py)
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.+)$' % re.escape(settings.MEDIA_URL.lstrip('/')), movieMedia.serve, name='media'),
+    ]
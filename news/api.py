@@ -0,0 +1,12 @@
+from movie.api import api_view, parse_fields, stream_page
+
+from .models import News
+
+NEWS_FIELDS = ('id', 'headline', 'body', 'date')
+
+
+@api_view
+def news_list(request):
+    """Noticias de la más reciente a la más antigua, con la misma paginación que /api/movies/."""
+    fields = parse_fields(request, NEWS_FIELDS)
+    return stream_page(request, News.objects.all(), fields, ordering=('-date', '-id'))
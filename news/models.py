@@ -5,6 +5,7 @@ class News(models.Model):
     headline = models.CharField(max_length=200)
     body = models.TextField()
     date = models.DateField()
+    updated_at = models.DateTimeField(auto_now=True)  # clave de la caché de fragmentos (news.html)
 
     def __str__(self):
         return self.headline
\ No newline at end of file